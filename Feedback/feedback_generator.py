@@ -1,5 +1,9 @@
 import os
+import sys
 import json
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, as_completed
+import httpx
 from langchain_ollama import OllamaLLM
 
 # ================================
@@ -8,6 +12,43 @@ from langchain_ollama import OllamaLLM
 
 DEBUG_MODE = True   # Set to False in production
 
+# "parallel"   -> strengths / weaknesses / role-fit prompts run concurrently
+# "combined"   -> one prompt returns all three fields in a single generation
+# "sequential" -> the three prompts run one after another
+FEEDBACK_MODE = os.getenv("FEEDBACK_MODE", "parallel")
+
+# Seconds an LLM call (including its retries) may run before giving up on it,
+# counted from when the call starts, not from when it was queued
+LLM_CALL_TIMEOUT = float(os.getenv("FEEDBACK_LLM_TIMEOUT", "120"))
+
+# Feedback requests generating at once; further ones wait in the queue of
+# the request pool (submit_feedback), not in a thread of the caller's pool
+FEEDBACK_CONCURRENCY = int(os.getenv("FEEDBACK_CONCURRENCY", "4"))
+
+# Shared pool for concurrent LLM calls, sized so the 3 calls of every
+# admitted feedback request start right away
+FEEDBACK_WORKERS = int(os.getenv("FEEDBACK_WORKERS", str(3 * FEEDBACK_CONCURRENCY)))
+_executor = ThreadPoolExecutor(
+    max_workers=FEEDBACK_WORKERS,
+    thread_name_prefix="feedback-llm",
+)
+_request_executor = ThreadPoolExecutor(
+    max_workers=FEEDBACK_CONCURRENCY,
+    thread_name_prefix="feedback-request",
+)
+
+
+class FeedbackTimeout(TimeoutError):
+    """An LLM call ran past its timeout; the feedback would be incomplete."""
+
+
+class FeedbackError(RuntimeError):
+    """An LLM call failed (connection refused, server error); the feedback would be incomplete."""
+
+
+class FeedbackCancelled(Exception):
+    """Another LLM call of the same feedback failed, so this one stopped."""
+
 
 # ================================
 # LOGGER
@@ -22,14 +63,43 @@ def log(message: str):
 # MODEL LOADER (LLaMA 3 via Ollama)
 # ================================
 
+# How long the Ollama server keeps llama3 loaded in memory between requests
+# (model residency, not HTTP keep-alive)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Seconds an idle HTTP connection to Ollama is kept open for reuse
+OLLAMA_CONN_KEEPALIVE_S = float(os.getenv("OLLAMA_CONN_KEEPALIVE_S", "300"))
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
 def get_llama_model():
     """
-    Loads the local LLaMA 3 model through Ollama.
+    Returns the shared LLaMA 3 client (created on first use).
+    One OllamaLLM, and so one httpx connection pool with a keep-alive
+    connection per feedback worker, is reused by every call and thread;
+    requests reuse open connections instead of reconnecting.
+    keep_alive only keeps llama3 loaded on the Ollama server.
     """
-    return OllamaLLM(
-        model="llama3",
-        temperature=0.2
-    )
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = OllamaLLM(
+                    model="llama3",
+                    temperature=0.2,
+                    keep_alive=OLLAMA_KEEP_ALIVE,
+                    client_kwargs={
+                        # a hung request must not hold a worker past the call timeout
+                        "timeout": LLM_CALL_TIMEOUT,
+                        "limits": httpx.Limits(
+                            max_connections=FEEDBACK_WORKERS,
+                            max_keepalive_connections=FEEDBACK_WORKERS,
+                            keepalive_expiry=OLLAMA_CONN_KEEPALIVE_S,
+                        ),
+                    },
+                )
+    return _llm
 
 
 # ================================
@@ -38,11 +108,27 @@ def get_llama_model():
 
 PROMPT_FOLDER = os.path.join(os.path.dirname(__file__), "prompts")
 
+_prompt_cache = {}  # path -> (mtime_ns, text)
+_prompt_lock = threading.Lock()
+
+
 def load_prompt(filename: str) -> str:
-    """Load a prompt from the prompts folder."""
+    """
+    Load a prompt from the prompts folder.
+    Templates are cached and only re-read when the file changes.
+    """
     path = os.path.join(PROMPT_FOLDER, filename)
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
+    mtime = os.stat(path).st_mtime_ns
+
+    cached = _prompt_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _prompt_lock:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        _prompt_cache[path] = (mtime, text)
+    return text
 
 
 # ================================
@@ -59,8 +145,8 @@ def call_llm(prompt: str) -> str:
         response = llm.invoke(prompt)
         return response
     except Exception as e:
-        print("LLM ERROR:", e)
-        return "{}"  # fail-safe empty JSON
+        log(f"LLM ERROR: {e}")
+        raise FeedbackError(f"LLM call failed: {e}") from e
 
 
 
@@ -156,43 +242,153 @@ def normalize_string_list(items):
 
 import time
 
-def call_llm_with_retry(prompt: str, max_retries: int = 2, interval: float = 0.5):
+def call_llm_with_retry(prompt: str, max_retries: int = 2, interval: float = 0.5, timeout: float = None,
+                        cancel: threading.Event = None):
     """
     Calls the LLM with retry logic.
-    - If parsing fails, tries again up to max_retries.
-    - Helps handle temporary bad JSON or partial outputs.
+    - If parsing or the call fails, tries again up to max_retries.
+    - Helps handle temporary bad JSON, partial outputs or a restarting server.
+    - Before every attempt: raises FeedbackTimeout once timeout seconds
+      have passed since the first attempt started, and FeedbackCancelled
+      once cancel is set.
+    - Raises FeedbackError when every attempt failed to reach the LLM.
     """
     attempt = 0
-    last_output = "{}"  # in case all retries fail
+    last_output = None  # in case all retries fail
+    last_error = None
+    deadline = None if timeout is None else time.monotonic() + timeout
 
     while attempt <= max_retries:
+        if cancel is not None and cancel.is_set():
+            raise FeedbackCancelled("another LLM call of this feedback failed")
+        if deadline is not None and time.monotonic() >= deadline:
+            raise FeedbackTimeout(f"no valid LLM output within {timeout}s")
+
         log(f"LLM attempt {attempt + 1} of {max_retries + 1}")
 
-        raw = call_llm(prompt)
-        last_output = raw  
+        try:
+            raw = call_llm(prompt)
+        except FeedbackError as e:
+            last_error = e
+            log("LLM call failed. Retrying...")
+        else:
+            last_output = raw
+            parsed = safe_json_parse(raw)
 
-        parsed = safe_json_parse(raw)
+            if parsed:  # success
+                return parsed
 
-        if parsed:  # success
-            return parsed
+            log("Parse failed. Retrying...")
 
-        log("Parse failed. Retrying...")
         attempt += 1
-        time.sleep(interval)
+        if cancel is not None:
+            cancel.wait(interval)
+        else:
+            time.sleep(interval)
+
+    if last_output is None:
+        raise last_error
 
     log("All retries failed. Returning last output.")
     return safe_json_parse(last_output) or {}
 
 
 
+# ================================
+# CONCURRENT LLM CALLS
+# ================================
+
+def run_llm_calls(prompts: dict, timeout: float = None) -> dict:
+    """
+    Runs call_llm_with_retry for every prompt concurrently.
+    Each call's timeout counts from when that call starts. The first call
+    that times out or fails cancels the others (queued ones never start,
+    running ones stop before their next attempt), and the feedback is
+    reported as FeedbackTimeout or FeedbackError, never as empty feedback.
+    """
+    timeout = LLM_CALL_TIMEOUT if timeout is None else timeout
+    cancel = threading.Event()
+
+    futures = {
+        _executor.submit(call_llm_with_retry, prompt, timeout=timeout, cancel=cancel): name
+        for name, prompt in prompts.items()
+    }
+
+    results, timed_out, failed = {}, [], []
+    for future in as_completed(futures):
+        name = futures[future]
+        try:
+            results[name] = future.result()
+            continue
+        except (FeedbackCancelled, CancelledError):
+            continue
+        except FeedbackTimeout as e:
+            timed_out.append(f"{name}: {e}")
+        except Exception as e:
+            log(f"LLM ERROR ({name}): {e}")
+            failed.append(f"{name}: {e}")
+
+        # this feedback is lost: stop the sibling calls
+        cancel.set()
+        for other in futures:
+            other.cancel()
+
+    if timed_out:
+        log(f"{len(timed_out)} LLM call(s) timed out.")
+        raise FeedbackTimeout("; ".join(timed_out + failed))
+    if failed:
+        raise FeedbackError("; ".join(failed))
+    return results
+
+
+def build_feedback(parsed_strengths: dict, parsed_weaknesses: dict, parsed_role_fit: dict) -> dict:
+    """Validate and normalize parsed LLM outputs into the feedback dict."""
+    role_fit = parsed_role_fit.get("role_fit_explanation", "")
+
+    return {
+        "strengths": normalize_string_list(
+            validate_list_field(parsed_strengths, "strengths")
+        ),
+
+        "weaknesses": normalize_string_list(
+            validate_list_field(parsed_weaknesses, "weaknesses")
+        ),
+
+        "role_fit_explanation": role_fit if isinstance(role_fit, str) else ""
+    }
+
+
 # ================================
 # MAIN FEEDBACK GENERATOR
 # ================================
-def generate_feedback(jd_text: str, cv_text: str, score: float) -> dict:
+def generate_feedback(jd_text: str, cv_text: str, score: float, mode: str = None, timeout: float = None) -> dict:
     """
     Generates STRENGTHS, WEAKNESSES, and ROLE-FIT EXPLANATION
     using LLaMA 3 + retry, JSON repair, validation & normalization.
+
+    mode defaults to FEEDBACK_MODE ("parallel", "combined" or "sequential");
+    timeout is the per-call limit in seconds (LLM_CALL_TIMEOUT by default).
+    Raises FeedbackTimeout when an LLM call runs out of time and
+    FeedbackError when one cannot reach the LLM.
     """
+    mode = mode or FEEDBACK_MODE
+
+    if mode == "combined":
+        return generate_feedback_combined(jd_text, cv_text, score, timeout=timeout)
+    return _generate_feedback_split(jd_text, cv_text, score, mode, timeout)
+
+
+def submit_feedback(jd_text: str, cv_text: str, score: float, mode: str = None, timeout: float = None) -> Future:
+    """
+    generate_feedback on the feedback request pool. At most
+    FEEDBACK_CONCURRENCY requests generate at once; the rest wait in the
+    pool's queue without holding a thread (await it with asyncio.wrap_future).
+    """
+    return _request_executor.submit(generate_feedback, jd_text, cv_text, score, mode=mode, timeout=timeout)
+
+
+def _generate_feedback_split(jd_text: str, cv_text: str, score: float, mode: str, timeout: float = None) -> dict:
+    """One prompt per field, run concurrently or (mode="sequential") in turn."""
 
     log("Loading prompts...")
 
@@ -202,34 +398,54 @@ def generate_feedback(jd_text: str, cv_text: str, score: float) -> dict:
 
     log("Formatting prompts...")
 
-    strengths_filled = strengths_prompt.format(jd_text=jd_text, cv_text=cv_text)
-    weaknesses_filled = weaknesses_prompt.format(jd_text=jd_text, cv_text=cv_text)
-    role_fit_filled = role_fit_prompt.format(jd_text=jd_text, cv_text=cv_text, score=score)
+    prompts = {
+        "strengths": strengths_prompt.format(jd_text=jd_text, cv_text=cv_text),
+        "weaknesses": weaknesses_prompt.format(jd_text=jd_text, cv_text=cv_text),
+        "role_fit": role_fit_prompt.format(jd_text=jd_text, cv_text=cv_text, score=score),
+    }
 
-    log("Calling LLaMA with retry for strengths...")
-    parsed_strengths = call_llm_with_retry(strengths_filled)
+    if mode == "sequential":
+        log("Calling LLaMA with retry for strengths, weaknesses, role fit in turn...")
+        timeout = LLM_CALL_TIMEOUT if timeout is None else timeout
+        parsed = {name: call_llm_with_retry(prompt, timeout=timeout) for name, prompt in prompts.items()}
+    else:
+        log("Calling LLaMA with retry for strengths, weaknesses, role fit concurrently...")
+        parsed = run_llm_calls(prompts, timeout=timeout)
 
-    log("Calling LLaMA with retry for weaknesses...")
-    parsed_weaknesses = call_llm_with_retry(weaknesses_filled)
+    log("Validating and normalizing outputs...")
 
-    log("Calling LLaMA with retry for role fit...")
-    parsed_role_fit = call_llm_with_retry(role_fit_filled)
+    return build_feedback(parsed["strengths"], parsed["weaknesses"], parsed["role_fit"])
 
-    log("Validating and normalizing outputs...")
 
-    feedback = {
-        "strengths": normalize_string_list(
-            validate_list_field(parsed_strengths, "strengths")
-        ),
+def generate_feedback_combined(jd_text: str, cv_text: str, score: float, timeout: float = None) -> dict:
+    """
+    Single-generation variant: one prompt returns strengths, weaknesses
+    and role-fit explanation together (called by generate_feedback).
+    """
+    log("Loading combined prompt...")
+    prompt = load_prompt("combined.txt").format(jd_text=jd_text, cv_text=cv_text, score=score)
 
-        "weaknesses": normalize_string_list(
-            validate_list_field(parsed_weaknesses, "weaknesses")
-        ),
+    log("Calling LLaMA with retry for combined feedback...")
+    parsed = run_llm_calls({"combined": prompt}, timeout=timeout)["combined"]
 
-        "role_fit_explanation": parsed_role_fit.get("role_fit_explanation", "")
-    }
+    log("Validating and normalizing outputs...")
+    return build_feedback(parsed, parsed, parsed)
 
-    return feedback
+
+def benchmark_feedback_modes(cases: list, modes=("sequential", "parallel", "combined")) -> dict:
+    """
+    Wall-clock latency of each feedback mode over (name, jd, cv, score) cases.
+    Returns {mode: {"total_s", "mean_s"}}.
+    """
+    timings = {}
+    for mode in modes:
+        start = time.perf_counter()
+        for _, jd, cv, score in cases:
+            generate_feedback(jd, cv, score, mode=mode)
+        total = time.perf_counter() - start
+        timings[mode] = {"total_s": round(total, 2), "mean_s": round(total / len(cases), 2)}
+        print(f"[BENCH] {mode:<10} total={timings[mode]['total_s']}s mean={timings[mode]['mean_s']}s")
+    return timings
 
 # ================================
 # LOCAL TESTING (DEV ONLY)
@@ -326,6 +542,13 @@ if __name__ == "__main__":
         ("Fresher SWE", jd_fresher, cv_fresher, 81.0),
     ]
 
+    # ----------------------------
+    # Latency benchmark: python feedback_generator.py --benchmark
+    # ----------------------------
+    if "--benchmark" in sys.argv:
+        print(json.dumps(benchmark_feedback_modes(tests), indent=2))
+        sys.exit(0)
+
     # ----------------------------
     # Run all tests
     # ----------------------------
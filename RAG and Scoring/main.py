@@ -1,11 +1,20 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlalchemy import create_engine, Column, String, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from rag import load_jd_embedding, load_cv_index
-from score import retrieve_chunks, compute_score
+import time
+from typing import List, Optional
+
+from rag import (
+    score_candidates as rag_score_candidates,
+    index_cache,
+    invalidate_cache,
+    load_jd_embedding,
+    rank_candidates,
+    search_pool,
+)
 
 DATABASE_URL = "sqlite:///./applications.db"
 
@@ -47,6 +56,71 @@ class ScoreResponse(BaseModel):
     score: float
 
 
+class BatchScoreRequest(BaseModel):
+    candidate_ids: List[str]
+    company_id: str
+    job_id: str
+
+
+class BatchScoreResponse(BaseModel):
+    job_id: str
+    company_id: str
+    scores: List[ScoreResponse]
+
+
+class SearchRequest(BaseModel):
+    company_id: str
+    # rank one job's candidates, or the whole company's when omitted
+    job_id: Optional[str] = None
+    # the JD to rank against: a stored job's JD vector (defaults to job_id) ...
+    jd_job_id: Optional[str] = None
+    # ... or raw JD text, embedded on the fly
+    jd_text: Optional[str] = None
+    k: int = Field(10, ge=1, description="top chunks averaged per candidate, as in /score")
+    page: int = Field(1, ge=1)
+    page_size: int = Field(20, ge=1, le=200)
+
+
+class SearchHit(BaseModel):
+    candidate_id: str
+    job_id: str
+    score: float
+    best_snippet: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    company_id: str
+    job_id: Optional[str]
+    total: int
+    page: int
+    page_size: int
+    results: List[SearchHit]
+    took_ms: float
+
+
+class ChunkSearchRequest(BaseModel):
+    company_id: str
+    # the query: a stored job's JD vector ...
+    jd_job_id: Optional[str] = None
+    # ... or raw text, embedded on the fly
+    query_text: Optional[str] = None
+    k: int = Field(10, ge=1, le=200)
+
+
+class ChunkHit(BaseModel):
+    candidate_id: Optional[str]
+    job_id: str
+    chunk_id: Optional[int]
+    snippet: Optional[str] = None
+    similarity: float
+
+
+class ChunkSearchResponse(BaseModel):
+    company_id: str
+    results: List[ChunkHit]
+    took_ms: float
+
+
 # =========================
 # FastAPI App
 # =========================
@@ -58,17 +132,10 @@ def score_candidate(req: ScoreRequest):
     db = SessionLocal()
 
     try:
-        # Load embeddings / index
-        jd_embedding = load_jd_embedding(
-            req.company_id, req.job_id
-        )
-
-        index, _ = load_cv_index(
-            req.company_id, req.job_id
-        )
-
-        cv_vectors = retrieve_chunks(jd_embedding, index)
-        score = compute_score(jd_embedding, cv_vectors,k=10)
+        # Only this candidate's chunks take part in the score
+        score = float(rag_score_candidates(
+            req.company_id, req.job_id, [req.candidate_id], k=10
+        )[0])
 
         # Upsert score
         record = Application(
@@ -96,3 +163,111 @@ def score_candidate(req: ScoreRequest):
 
     finally:
         db.close()
+
+
+@app.post("/score/batch", response_model=BatchScoreResponse)
+def score_candidates(req: BatchScoreRequest):
+    """Score many candidates of one job with a single vectorized pass."""
+    db = SessionLocal()
+
+    try:
+        scores = rag_score_candidates(
+            req.company_id, req.job_id, req.candidate_ids, k=10
+        )
+
+        results = []
+        for candidate_id, score in zip(req.candidate_ids, scores):
+            db.merge(Application(
+                candidate_id=candidate_id,
+                job_id=req.job_id,
+                company_id=req.company_id,
+                score=score
+            ))
+            results.append({
+                "candidate_id": candidate_id,
+                "job_id": req.job_id,
+                "company_id": req.company_id,
+                "score": score
+            })
+        db.commit()
+
+        return {"job_id": req.job_id, "company_id": req.company_id, "scores": results}
+
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    finally:
+        db.close()
+
+
+def _query_embedding(company_id: str, text: Optional[str], jd_job_id: Optional[str]):
+    """Embedding of text, or else the stored JD vector of jd_job_id."""
+    if text:
+        from embeddings.embeddings import embed_text  # loads the model on first use
+
+        return embed_text(text)
+    if jd_job_id is None:
+        raise HTTPException(status_code=400, detail="Give a query text or a job id")
+    try:
+        return load_jd_embedding(company_id, jd_job_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/search", response_model=SearchResponse)
+def search_candidates(req: SearchRequest):
+    """
+    Rank every stored candidate of a job (or of the whole company) against
+    a JD, with the same top-k mean as /score, one page at a time.
+    """
+    start = time.perf_counter()
+    jd_embedding = _query_embedding(req.company_id, req.jd_text, req.jd_job_id or req.job_id)
+
+    total, results = rank_candidates(
+        jd_embedding,
+        req.company_id,
+        req.job_id,
+        k=req.k,
+        offset=(req.page - 1) * req.page_size,
+        limit=req.page_size,
+    )
+
+    return {
+        "company_id": req.company_id,
+        "job_id": req.job_id,
+        "total": total,
+        "page": req.page,
+        "page_size": req.page_size,
+        "results": results,
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+@app.post("/search/chunks", response_model=ChunkSearchResponse)
+def search_company_chunks(req: ChunkSearchRequest):
+    """
+    The k CV chunks across all of a company's jobs most similar to a JD
+    or free text, best first. Large shards are searched through their
+    ANN index (see search_pool), small ones exactly.
+    """
+    start = time.perf_counter()
+    query = _query_embedding(req.company_id, req.query_text, req.jd_job_id)
+    results = search_pool(query, req.company_id, data_type="CV", k=req.k)
+    return {
+        "company_id": req.company_id,
+        "results": results,
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters and memory use of the in-process index cache."""
+    return index_cache.stats()
+
+
+@app.post("/cache/invalidate")
+def cache_invalidate(company_id: str = None, job_id: str = None):
+    """Drop cached indices for one job/company, or all of them."""
+    invalidate_cache(company_id, job_id)
+    return index_cache.stats()
@@ -1,50 +1,442 @@
 import faiss
 import numpy as np
-import json
 import os
+import sys
+import threading
+from collections import OrderedDict
+
+from score import retrieve_chunks, compute_score, compute_scores_grouped, group_slots, compute_scores_padded, score_value
 
 # 🔑 Absolute shared vector store
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 STORE_ROOT = os.path.join(BASE_DIR, "vector_store")
 
 INDICES_DIR = os.path.join(STORE_ROOT, "indices")
-META_DIR = os.path.join(STORE_ROOT, "metadata")
+METADATA_DB = os.path.join(STORE_ROOT, "metadata.db")
 
+# metadata schema is shared with the writer in embeddings/
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+from embeddings.metadata_store import MetadataStore  # noqa: E402
+from embeddings.embeddings import SHARD_COUNT, shard_of, shard_prefix  # noqa: E402
+from embeddings.index_factory import ANN_MIN_VECTORS, tune_index  # noqa: E402
 
-def load_jd_embedding(company_id: str, job_id: str) -> np.ndarray:
-    index_path = os.path.join(
-        INDICES_DIR,
-        f"company_{company_id}_job_{job_id}_jd.index"
-    )
+# In-process cache of loaded indices (see IndexCache)
+CACHE_MAX_BYTES = int(os.getenv("RAG_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Indices at least this big are memory-mapped instead of read into RAM (0 = never)
+MMAP_MIN_BYTES = int(os.getenv("RAG_MMAP_MIN_MB", "0")) * 1024 * 1024
+# ANN hits fetched per wanted result, before exact re-ranking
+ANN_OVERSAMPLE = int(os.getenv("RAG_ANN_OVERSAMPLE", "4"))
+
+
+# =========================
+# Index cache
+# =========================
+class IndexCache:
+    """
+    Bounded LRU cache of loaded FAISS index files.
+
+    Entries are keyed by index file name and remember the (mtime, size)
+    of the files they were loaded from, so a rewritten file (a shard's
+    newest segment) is picked up on the next request while full segments
+    stay cached. invalidate() with no names bumps a version counter and
+    drops everything for callers that need a hard reset.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (signature, value, nbytes)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _signature(paths):
+        sig = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append(None)
+        return tuple(sig)
+
+    def get(self, key, paths, loader, token=None, nbytes=None, refresh=None):
+        """
+        Return the cached value for key, calling loader() on a miss or when
+        any of paths changed on disk since the value was loaded (or token,
+        for values derived from something other than files, changed).
+        nbytes overrides the file sizes as the entry's memory estimate.
+        refresh(old_value, old_token), if given, may update a stale value
+        incrementally; returning None falls back to loader().
+        """
+        file_signature = self._signature(paths)
+        signature = (file_signature, token)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == (self.version, signature):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self.version
+            stale = entry if entry is not None and entry[0][0] == version else None
+
+        # Load outside the lock so a slow read does not block other keys
+        value = None
+        if refresh is not None and stale is not None:
+            value = refresh(stale[1], stale[0][1][1])
+        if value is None:
+            value = loader()
+        if nbytes is None:
+            nbytes = sum(size for _, size in filter(None, file_signature))
+        elif callable(nbytes):
+            nbytes = nbytes(value)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            if nbytes <= self.max_bytes and version == self.version:
+                self._entries[key] = ((version, signature), value, nbytes)
+                self.current_bytes += nbytes
+                self._evict()
+        return value
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, _, nbytes) = self._entries.popitem(last=False)
+            self.current_bytes -= nbytes
+            self.evictions += 1
+
+    def invalidate(self, keys=None):
+        """Drop the given entries, or everything when no keys are given."""
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+                self.current_bytes = 0
+                self.version += 1
+                return
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self.current_bytes -= entry[2]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "version": self.version,
+            }
+
+
+index_cache = IndexCache()
+
+_metadata_store = None
+
+
+def get_metadata_store() -> MetadataStore:
+    global _metadata_store
+    if _metadata_store is None:
+        _metadata_store = MetadataStore(METADATA_DB)
+    return _metadata_store
+
+
+def read_index(index_path: str):
+    """Read a FAISS index, memory-mapping it when it is large."""
+    if MMAP_MIN_BYTES and os.path.getsize(index_path) >= MMAP_MIN_BYTES:
+        return faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+    return faiss.read_index(index_path)
+
+
+def invalidate_cache(company_id: str = None, job_id: str = None):
+    """
+    Drop cached files holding one job's / company's vectors, or the
+    whole cache. Shard files are shared, so other tenants reload them too.
+    """
+    if company_id is None:
+        index_cache.invalidate()
+    else:
+        index_cache.invalidate(get_metadata_store().index_names(company_id, job_id))
+
+
+# =========================
+# Loaders
+# =========================
+def load_index_file(index_name: str):
+    """One store file (shard segment or legacy per-job index), cached."""
+    index_path = os.path.join(INDICES_DIR, index_name)
 
     if not os.path.exists(index_path):
-        raise FileNotFoundError(f"JD index not found: {index_path}")
+        raise FileNotFoundError(f"Index not found: {index_path}")
+
+    return index_cache.get(index_name, [index_path], lambda: read_index(index_path))
+
+
+def load_ann_index(index_name: str):
+    """A shard's ANN search index (see embeddings/index_factory.py), cached."""
+    index_path = os.path.join(INDICES_DIR, index_name)
+    return index_cache.get(
+        index_name, [index_path], lambda: tune_index(faiss.read_index(index_path))
+    )
+
+
+def load_vectors(rows: list) -> np.ndarray:
+    """
+    Vectors behind metadata rows, in rows order.
+    Rows are grouped per file, so each file is fetched once and read
+    with one bulk reconstruct.
+    """
+    by_file = {}
+    for pos, row in enumerate(rows):
+        by_file.setdefault(row["index_name"], []).append(pos)
+
+    out = None
+    for index_name, positions in by_file.items():
+        index = load_index_file(index_name)
+        if out is None:
+            out = np.empty((len(rows), index.d), dtype=np.float32)
+        ids = [rows[pos]["vector_id"] for pos in positions]
+        out[positions] = retrieve_chunks(None, index, ids)
+    return out
 
-    index = faiss.read_index(index_path)
 
+def load_jd_embedding(company_id: str, job_id: str) -> np.ndarray:
+    row = get_metadata_store().latest(company_id, job_id, "JD")
+    if row is None:
+        raise FileNotFoundError(f"JD not found for company {company_id} job {job_id}")
     # JD has exactly ONE vector
-    return index.reconstruct(0)
+    return load_vectors([row])[0]
 
 
-def load_cv_index(company_id: str, job_id: str):
-    index_path = os.path.join(
-        INDICES_DIR,
-        f"company_{company_id}_job_{job_id}_cv.index"
-    )
+def candidate_rows(company_id: str, job_id: str, candidate_ids: list):
+    """
+    Metadata rows of several candidates' chunks with one indexed query.
+    Returns (rows, labels) where labels[i] is the position in
+    candidate_ids of the candidate that owns rows[i].
+    """
+    wanted = {cid: pos for pos, cid in enumerate(candidate_ids)}
+    rows = get_metadata_store().rows(company_id, job_id, "CV", candidate_ids=list(wanted))
+    labels = [wanted[row["candidate_id"]] for row in rows]
+    return rows, np.asarray(labels, dtype=np.int64)
 
-    meta_path = os.path.join(
-        META_DIR,
-        f"company_{company_id}_job_{job_id}_cv.json"
-    )
 
-    if not os.path.exists(index_path):
-        raise FileNotFoundError(f"CV index not found: {index_path}")
+# =========================
+# Scoring
+# =========================
+def score_candidates(company_id: str, job_id: str, candidate_ids: list, k: int = 10) -> list:
+    """
+    RAG scores for candidates of one job, in candidate_ids order.
+    Raises FileNotFoundError when the JD or any candidate's chunks
+    are missing.
+    """
+    jd_embedding = load_jd_embedding(company_id, job_id)
+
+    rows, labels = candidate_rows(company_id, job_id, candidate_ids)
+    missing = set(range(len(candidate_ids))) - set(labels.tolist())
+    if missing:
+        raise FileNotFoundError(
+            f"No CV chunks stored for candidates {[candidate_ids[i] for i in sorted(missing)]}"
+        )
+
+    cv_vectors = load_vectors(rows)
+    if len(candidate_ids) == 1:
+        return [score_value(compute_score(jd_embedding, cv_vectors, k=k))]  # not np.float32: callers store it
+    return [
+        score_value(score)
+        for score in compute_scores_grouped(jd_embedding, cv_vectors, labels, len(candidate_ids), k=k)
+    ]
+
+
+def _rank(query: np.ndarray, rows: list, k: int) -> list:
+    """Exact top-k of rows by cosine similarity to a normalized query."""
+    if not rows:
+        return []
+    sims = load_vectors(rows) @ query
+
+    k = min(k, len(sims))
+    top = np.argpartition(-sims, k - 1)[:k] if k < len(sims) else np.arange(len(sims))
+    top = top[np.argsort(-sims[top])]
+
+    return [
+        {
+            "company_id": rows[i]["company_id"],
+            "job_id": rows[i]["job_id"],
+            "candidate_id": rows[i]["candidate_id"],
+            "chunk_id": rows[i]["chunk_id"],
+            "snippet": rows[i]["snippet"],
+            "similarity": float(sims[i]),
+        }
+        for i in top
+    ]
+
+
+def _normalize(query_embedding) -> np.ndarray:
+    query = np.asarray(query_embedding, dtype=np.float32)
+    return query / np.linalg.norm(query)
+
+
+def search_chunks(query_embedding, company_id: str, job_id: str = None,
+                  candidate_ids: list = None, data_type: str = "CV", k: int = 10) -> list:
+    """
+    Filtered similarity search: the k chunks of one company (optionally
+    one job / some candidates) most similar to query_embedding, best
+    first. Filtering happens in the metadata store, so only the matching
+    vectors are read from the shared shard files.
+    """
+    rows = get_metadata_store().rows(company_id, job_id, data_type, candidate_ids=candidate_ids)
+    return _rank(_normalize(query_embedding), rows, k)
+
+
+def search_pool(query_embedding, company_id: str = None, data_type: str = "CV", k: int = 10) -> list:
+    """
+    The k best-matching chunks across the whole pool (every company, or
+    one company's every job), best first.
 
-    index = faiss.read_index(index_path)
+    - a company with fewer than ANN_MIN_VECTORS vectors: exact filtered
+      scan (search_chunks), cheaper than any index
+    - shards promoted to an ANN index: k * ANN_OVERSAMPLE ANN hits plus
+      the rows added since the index was built, post-filtered by company
+    - other shards: exact scan
+    Candidates are always re-scored exactly against the stored vectors.
+    """
+    store = get_metadata_store()
+    if company_id is not None and store.count(company_id, None, data_type) < ANN_MIN_VECTORS:
+        return search_chunks(query_embedding, company_id, data_type=data_type, k=k)
+
+    query = _normalize(query_embedding)
+    shards = [shard_of(company_id)] if company_id is not None else range(SHARD_COUNT)
+    candidates = []
+    for shard in shards:
+        prefix = shard_prefix(data_type, shard)
+        ann = store.get_ann(data_type, shard)
+        if ann is None:
+            rows = store.rows_by_index(prefix)
+        else:
+            _, ids = load_ann_index(ann["index_name"]).search(query[None, :], k * ANN_OVERSAMPLE)
+            rows = store.rows_by_ids(ids[0][ids[0] >= 0])
+            rows += store.rows_by_index(prefix, after_id=ann["max_row_id"])
+        if company_id is not None:
+            rows = [row for row in rows if row["company_id"] == str(company_id)]
+        candidates.extend(rows)
+
+    hits = _rank(query, candidates, k)
+    if company_id is not None and len(hits) < k:
+        # the company is a small part of a promoted shard; ANN hits went elsewhere
+        return search_chunks(query_embedding, company_id, data_type=data_type, k=k)
+    return hits
+
+
+# =========================
+# Talent-pool ranking
+# =========================
+class CandidatePool:
+    """
+    Precomputed scoring view of every stored candidate in a scope (one
+    job, or a whole company): normalized chunk vectors, the per-candidate
+    padded slot matrix and each candidate's identity. Ranking a JD
+    against it is one matrix-vector product plus a padded top-k.
+    Pools are immutable; extended() returns a new one.
+    """
+
+    def __init__(self, rows: list, base: "CandidatePool" = None):
+        # chunks without a candidate (pre-candidate_id data) cannot be ranked
+        rows = [row for row in rows if row["candidate_id"] is not None]
+        groups = dict(base.groups) if base is not None else {}
+        labels = np.empty(len(rows), dtype=np.int64)
+        for i, row in enumerate(rows):
+            labels[i] = groups.setdefault((row["job_id"], row["candidate_id"]), len(groups))
+
+        vectors = load_vectors(rows) if rows else np.zeros((0, 0), dtype=np.float32)
+        if rows:
+            vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        self.groups = groups  # (job_id, candidate_id) -> group
+        self.candidates = list(groups)
+        if base is not None and len(base.labels):
+            self.labels = np.concatenate([base.labels, labels])
+            self.vectors = np.concatenate([base.vectors, vectors]) if rows else base.vectors
+            self.snippets = base.snippets + [row["snippet"] for row in rows]
+            self.max_row_id = max([base.max_row_id] + [row["id"] for row in rows])
+        else:
+            self.labels = labels
+            self.vectors = vectors
+            self.snippets = [row["snippet"] for row in rows]
+            self.max_row_id = max([row["id"] for row in rows], default=0)
+        self.slots = group_slots(self.labels, len(groups))
+
+    def extended(self, rows: list) -> "CandidatePool":
+        """This pool plus newly inserted rows (no rebuild of existing data)."""
+        return CandidatePool(rows, base=self)
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.slots.nbytes
+
+    def rank(self, jd_embedding, k: int = 10, offset: int = 0, limit: int = 20):
+        """(total, page) of candidates by compute_score, best first."""
+        if not self.candidates:
+            return 0, []
+        jd = np.asarray(jd_embedding, dtype=np.float32)
+        sims = self.vectors @ (jd / np.linalg.norm(jd))
+        scores = compute_scores_padded(sims, self.slots, k=k)
+
+        # best first; ties keep insertion order so pages are stable
+        order = np.argsort(-scores, kind="stable")[offset:offset + limit]
+        page = []
+        for group in order:
+            slots = self.slots[group][self.slots[group] >= 0]
+            best = slots[np.argmax(sims[slots])]
+            job_id, candidate_id = self.candidates[group]
+            page.append({
+                "candidate_id": candidate_id,
+                "job_id": job_id,
+                "score": score_value(scores[group]),
+                "best_snippet": self.snippets[best],
+            })
+        return len(self.candidates), page
+
+
+def load_candidate_pool(company_id: str, job_id: str = None) -> CandidatePool:
+    """
+    CandidatePool for one job or a whole company, cached per scope.
+    New CVs extend the cached pool with just their rows; a deletion in
+    the company rebuilds it.
+    """
+    store = get_metadata_store()
+    version = store.scope_version(company_id)
+
+    def _refresh(pool, old_version):
+        if old_version[1] != version[1]:
+            return None  # rows were deleted
+        return pool.extended(store.rows(company_id, job_id, "CV", after_id=pool.max_row_id))
+
+    return index_cache.get(
+        ("pool", str(company_id), None if job_id is None else str(job_id)),
+        [],
+        lambda: CandidatePool(store.rows(company_id, job_id, "CV")),
+        token=version,
+        nbytes=lambda pool: pool.nbytes,
+        refresh=_refresh,
+    )
 
-    metadata = []
-    if os.path.exists(meta_path):
-        with open(meta_path, "r") as f:
-            metadata = json.load(f)
 
-    return index, metadata
+def rank_candidates(jd_embedding, company_id: str, job_id: str = None,
+                    k: int = 10, offset: int = 0, limit: int = 20):
+    """
+    Every stored candidate of one job (or the whole company) ranked by the
+    compute_score of their chunks against jd_embedding.
+    Returns (total candidates, page of results).
+    """
+    return load_candidate_pool(company_id, job_id).rank(jd_embedding, k=k, offset=offset, limit=limit)
@@ -1,33 +1,143 @@
 import numpy as np
 
-def retrieve_chunks(jd_embedding, index):
+def retrieve_chunks(jd_embedding, index, ids=None):
     """
-    Extract all CV vectors from FAISS index safely
+    Extract CV vectors from FAISS index safely.
+    If ids is given only those rows are read (one candidate's chunks).
+    Vectors are copied out in one bulk call instead of one call per row.
     """
-    n = index.ntotal
+    if ids is None:
+        return index.reconstruct_n(0, index.ntotal)
 
-    cv_vectors = np.vstack([index.reconstruct(i) for i in range(n)])
+    ids = np.asarray(ids, dtype=np.int64)
+    return index.reconstruct_batch(ids)
 
-    return cv_vectors
+
+def top_k_desc(sims, k):
+    """
+    The k largest similarities, highest first.
+    argpartition keeps this O(n) instead of a full sort.
+    """
+    k = min(k, len(sims))
+    if k < len(sims):
+        sims = sims[np.argpartition(-sims, k - 1)[:k]]
+    return np.sort(sims)[::-1]
+
+
+def stretch_scores(mean_sim):
+    """
+    Map mean cosine similarities onto the 0-100 score range.
+    Stays in float32, like the original per-vector loop, so every path
+    gives the scores that loop gave.
+    """
+    stretched = np.clip((mean_sim - 0.2) / 0.3, 0, 1)
+    return np.round(stretched * 100, 2)
+
+
+def stretch_score(mean_sim):
+    """Map a mean cosine similarity onto the 0-100 score range."""
+    return stretch_scores(np.float32(mean_sim))
+
+
+def score_value(score):
+    """A float32 score as the 2-decimal Python float callers store and return."""
+    return round(float(score), 2)
+
+
+def _mean_top(top, counts):
+    """
+    float32 mean of the first counts[i] entries of every row of top (each
+    row sorted highest first). Rows are averaged per count as contiguous
+    blocks, the same summation np.mean does for one candidate's list.
+    """
+    mean_sim = np.full(len(top), np.nan, dtype=np.float32)
+    for count in np.unique(counts[counts > 0]):
+        rows = np.flatnonzero(counts == count)
+        mean_sim[rows] = np.mean(top[rows, :count], axis=1)
+    return mean_sim
 
 
 def compute_score(jd_embedding,cv_vectors,k=10):
     jd=jd_embedding/np.linalg.norm(jd_embedding)
 
-    sims=[]
+    cv_vectors = np.atleast_2d(cv_vectors)
+    cv_vectors = cv_vectors / np.linalg.norm(cv_vectors, axis=1, keepdims=True)
+    sims = cv_vectors @ jd
+
+    top = top_k_desc(sims, k)
+
+    mean_sim = np.mean(np.ascontiguousarray(top))
+    return stretch_score(mean_sim)
+
 
-    for cv in cv_vectors:
-        cv=cv/np.linalg.norm(cv)
-        sims.append(np.dot(jd,cv))
+def compute_scores_grouped(jd_embedding, cv_vectors, labels, n_groups, k=10):
+    """
+    compute_score for many candidates in one vectorized pass.
+
+    labels[i] is the group (candidate) of cv_vectors[i], in 0..n_groups-1.
+    Returns a float32 array of n_groups scores; groups without rows get nan.
+    Same top-k mean + stretch as compute_score, and the same scores.
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    scores = np.full(n_groups, np.nan, dtype=np.float32)
+    if len(labels) == 0:
+        return scores
+
+    jd = jd_embedding / np.linalg.norm(jd_embedding)
+    cv_vectors = np.atleast_2d(cv_vectors)
+    sims = (cv_vectors / np.linalg.norm(cv_vectors, axis=1, keepdims=True)) @ jd
+
+    # sort by group, then by similarity (highest first) inside each group
+    order = np.lexsort((-sims, labels))
+    labels, sims = labels[order], sims[order]
+
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    counts = np.diff(np.r_[starts, len(labels)])
+    kept = np.minimum(counts, k)
+
+    # each group's top k, highest first, as rows of a padded matrix
+    top = np.zeros((len(starts), int(kept.max())), dtype=np.float32)
+    rows = np.repeat(np.arange(len(starts)), kept)
+    cols = np.arange(int(kept.sum())) - np.repeat(np.cumsum(kept) - kept, kept)
+    top[rows, cols] = sims[np.repeat(starts, kept) + cols]
+
+    scores[labels[starts]] = stretch_scores(_mean_top(top, kept))
+    return scores
+
+
+def group_slots(labels, n_groups):
+    """
+    Row positions of every group as a (n_groups, max_rows) matrix padded
+    with -1. Built once per candidate set, then reused for every query
+    by compute_scores_padded.
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    order = np.argsort(labels, kind="stable")
+    counts = np.bincount(labels, minlength=n_groups)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    rank = np.arange(len(labels)) - np.repeat(starts, counts)
+
+    slots = np.full((n_groups, max(int(counts.max(initial=0)), 1)), -1, dtype=np.int32)
+    slots[labels[order], rank] = order
+    return slots
+
+
+def compute_scores_padded(sims, slots, k=10):
+    """
+    compute_scores_grouped over precomputed group_slots.
+    sims are the cosine similarities of all rows to the JD. Per-group
+    top-k is an np.partition along the padded rows, so there is no
+    per-query sort of the whole candidate set. Groups without rows get nan.
+    """
+    if len(sims) == 0:
+        return np.full(len(slots), np.nan, dtype=np.float32)
 
-    sims.sort(reverse=True)
-    top = sims[:min(k, len(sims))]
+    valid = slots >= 0
+    padded = np.where(valid, sims[slots], -np.inf)
 
-    mean_sim = np.mean(top)
-    std_sim = np.std(top)
+    kk = min(k, slots.shape[1])
+    top = -np.sort(np.partition(-padded, kk - 1, axis=1)[:, :kk], axis=1)
+    counts = np.minimum(valid.sum(axis=1), k)
 
-    stretched = (mean_sim - 0.2) / 0.3
-    stretched = max(0, min(1, stretched))
+    return stretch_scores(_mean_top(top, counts))
 
-    score = stretched * 100
-    return round(score, 2)
\ No newline at end of file
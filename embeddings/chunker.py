@@ -0,0 +1,271 @@
+# token-aware, section-aware chunking of CV text for the sentence encoder
+#
+#   python -m embeddings.chunker --benchmark [--corpus DIR]
+#
+# all-MiniLM-L6-v2 reads at most max_seq_length (256) tokens, [CLS] and
+# [SEP] included; anything longer is cut off silently. Chunks are packed
+# up to that budget, measured with the model's own tokenizer.
+import os
+import re
+import time
+import argparse
+from typing import Iterator, List, Optional, Tuple
+
+# token budget per chunk (0 = the model's max_seq_length minus [CLS]/[SEP])
+CHUNK_TOKENS = int(os.getenv("EMBED_CHUNK_TOKENS", "0"))
+# tokens repeated at the start of the next chunk when a section is split
+CHUNK_OVERLAP_TOKENS = int(os.getenv("EMBED_CHUNK_OVERLAP_TOKENS", "32"))
+# sentences per tokenizer call; a long CV is tokenized as it is chunked
+TOKENIZE_SENTENCES = 64
+
+# a section starts at a line break or at an inline label such as
+# "Skills:" / "Work Experience:" (1-3 capitalized words and a colon)
+_SECTION_RE = re.compile(r"\n\s*|(?<=[.;!?])\s+(?=(?:[A-Z][\w&/+-]*\s?){1,3}:\s)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+(?=\S)|\s+[•▪●]\s+")
+_HEADING_RE = re.compile(r"^[A-Za-z&/ ]+:?$")
+
+
+def get_tokenizer():
+    """The embedding model's (fast) tokenizer."""
+    from embeddings.embeddings import get_model
+
+    return get_model().tokenizer
+
+
+def default_budget() -> int:
+    if CHUNK_TOKENS:
+        return CHUNK_TOKENS
+    from embeddings.embeddings import get_model
+
+    return get_model().max_seq_length - 2  # [CLS] + [SEP]
+
+
+def split_sections(text: str) -> List[str]:
+    """Sections of text; a bare heading line ("EXPERIENCE") stays with the section below it."""
+    sections = []
+    heading = ""
+    for section in _SECTION_RE.split(text):
+        section = section.strip() if section else ""
+        if not section:
+            continue
+        if len(section.split()) <= 3 and _HEADING_RE.match(section):
+            heading = f"{heading} {section}".strip()
+            continue
+        sections.append(f"{heading} {section}" if heading else section)
+        heading = ""
+    if heading:
+        sections.append(heading)
+    return sections
+
+
+def split_sentences(section: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(section) if s.strip()]
+
+
+class _Counter:
+    """Token counts (and token spans) of many strings with one tokenizer call."""
+
+    def __init__(self, tokenizer, texts: List[str]):
+        enc = tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True)
+        self.offsets = enc["offset_mapping"]
+        self.counts = [len(ids) for ids in enc["input_ids"]]
+
+
+def _tokenized_sections(sections: List[List[str]], tokenizer,
+                        window: int = TOKENIZE_SENTENCES) -> Iterator[Tuple[List[str], _Counter, int]]:
+    """
+    (sentences, counter, first) per section, where the section's counts
+    start at counter index first. Sections are tokenized a block of at
+    least window sentences at a time, not all up front.
+    """
+    start = 0
+    while start < len(sections):
+        end, n = start, 0
+        while end < len(sections) and (n < window or end == start):
+            n += len(sections[end])
+            end += 1
+        block = sections[start:end]
+        counter = _Counter(tokenizer, [sentence for section in block for sentence in section]) if n else None
+        first = 0
+        for section in block:
+            yield section, counter, first
+            first += len(section)
+        start = end
+
+
+def _split_long(sentence: str, offsets: List[Tuple[int, int]], budget: int, overlap: int) -> List[Tuple[str, int]]:
+    """
+    A sentence over the budget, cut into overlapping windows of at most
+    budget tokens. Windows start and end on word boundaries where a word
+    is shorter than the window.
+    """
+    def word_start(i):  # token i begins a word
+        return i == 0 or offsets[i][0] > offsets[i - 1][1]
+
+    pieces = []
+    start = 0
+    while start < len(offsets):
+        end = min(start + budget, len(offsets))
+        if end < len(offsets):
+            cut = end
+            while cut > start + 1 and not word_start(cut):
+                cut -= 1
+            end = cut if cut > start + 1 else end
+        pieces.append((sentence[offsets[start][0]:offsets[end - 1][1]], end - start))
+        if end == len(offsets):
+            break
+        nxt = max(start + 1, end - overlap)
+        while nxt > start + 1 and not word_start(nxt):
+            nxt -= 1
+        start = nxt if word_start(nxt) else max(start + 1, end - overlap)
+    return pieces
+
+
+def iter_chunks(text: str, max_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None,
+                tokenizer=None) -> Iterator[str]:
+    """
+    Yield chunks of text of at most max_tokens tokens.
+
+    - sentences are never split unless one alone is over the budget
+    - a section that fits in the current chunk joins it; one that fits in
+      an empty chunk starts a new one; only longer sections are split,
+      with overlap_tokens of trailing sentences repeated in the next chunk
+    - chunks come out as soon as they are full, and sentences are
+      tokenized in blocks as the chunking reaches them, so callers can
+      stream chunks into the encoder (embeddings.embed_chunk_stream)
+    """
+    max_tokens = max_tokens or default_budget()
+    overlap_tokens = CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    tokenizer = tokenizer or get_tokenizer()
+
+    sections = [split_sentences(section) for section in split_sections(text)]
+
+    current: List[Tuple[str, int]] = []  # (sentence, tokens) in the open chunk
+    used = 0
+    for section, counter, pos in _tokenized_sections(sections, tokenizer):
+        units = []
+        for sentence in section:
+            n = counter.counts[pos]
+            if n > max_tokens:
+                units.extend(_split_long(sentence, counter.offsets[pos], max_tokens, overlap_tokens))
+            elif n:
+                units.append((sentence, n))
+            pos += 1
+        size = sum(n for _, n in units)
+        if not units:
+            continue
+
+        if used + size <= max_tokens:
+            current.extend(units)
+            used += size
+            continue
+        if size <= max_tokens:
+            if current:
+                yield " ".join(s for s, _ in current)
+            current, used = list(units), size
+            continue
+
+        # section longer than a chunk: fill up sentence by sentence
+        for unit in units:
+            if current and used + unit[1] > max_tokens:
+                yield " ".join(s for s, _ in current)
+                carried, carried_tokens = [], 0
+                for prev in reversed(current):
+                    if carried_tokens + prev[1] > overlap_tokens or carried_tokens + prev[1] + unit[1] > max_tokens:
+                        break
+                    carried.insert(0, prev)
+                    carried_tokens += prev[1]
+                current, used = carried, carried_tokens
+            current.append(unit)
+            used += unit[1]
+
+    if current:
+        yield " ".join(s for s, _ in current)
+
+
+def chunk_words(text: str, chunk_size: int = 80, overlap: int = 20) -> List[str]:
+    """The previous fixed word windows (80 words, 20 overlap); kept for the benchmark."""
+    words = text.split()
+    chunks = []
+    i = 0
+    while i < len(words):
+        chunks.append(" ".join(words[i: i + chunk_size]))
+        i += chunk_size - overlap
+    return chunks
+
+
+# ----------------------------------------------------------------------
+# Chunking benchmark: old word windows vs token-aware chunks
+# ----------------------------------------------------------------------
+def _load_corpus(corpus_dir: Optional[str]) -> List[str]:
+    if corpus_dir:
+        texts = []
+        for name in sorted(os.listdir(corpus_dir)):
+            if name.endswith(".txt"):
+                with open(os.path.join(corpus_dir, name), encoding="utf-8", errors="replace") as f:
+                    texts.append(f.read())
+        return texts
+
+    # stand-in CVs, one line each like the pipeline's normalized raw_text
+    sections = [
+        "Education: B.Tech in Computer Science, National Institute of Technology, 2017 - 2021, CGPA 8.6.",
+        "Skills: Python, Java, SQL, Docker, Kubernetes, AWS, FastAPI, React, PostgreSQL, Redis, Kafka.",
+        "Experience: Software Engineer at Acme (2021 - present). Built REST APIs serving two million requests a day. "
+        "Migrated batch jobs to streaming pipelines and cut latency by 40%. Mentored three interns.",
+        "Projects: Resume ranker with sentence embeddings and FAISS. Chat assistant for support tickets.",
+        "Achievements: Winner of a national hackathon in 2020. Published a paper on retrieval evaluation.",
+    ]
+    return [" ".join([f"Candidate {i}."] + sections * (1 + i % 6)) for i in range(60)]
+
+
+def benchmark(corpus_dir: Optional[str] = None, batch_size: int = 32) -> dict:
+    """
+    Chunks per CV, chunks over the model's token limit and encode time
+    for the old 80/20 word windows vs iter_chunks, with the real model.
+    """
+    from embeddings.embeddings import _encode, get_model
+
+    model = get_model()
+    tokenizer = model.tokenizer
+    limit = model.max_seq_length - 2
+    texts = _load_corpus(corpus_dir)
+
+    report = {"cvs": len(texts), "token_limit": limit}
+    for label, chunker in (
+        ("words_80_20", chunk_words),
+        ("token_aware", lambda t: list(iter_chunks(t, tokenizer=tokenizer))),
+    ):
+        start = time.perf_counter()
+        chunked = [chunker(text) for text in texts]
+        chunk_s = time.perf_counter() - start
+        chunks = [c for cs in chunked for c in cs]
+        tokens = [len(ids) for ids in tokenizer(chunks, add_special_tokens=False)["input_ids"]]
+
+        _encode(chunks[:batch_size], batch_size)  # warm up
+        start = time.perf_counter()
+        _encode(chunks, batch_size)
+        encode_s = time.perf_counter() - start
+
+        report[label] = {
+            "chunks": len(chunks),
+            "chunks_per_cv": round(len(chunks) / len(texts), 2),
+            "tokens_encoded": sum(min(n, limit) for n in tokens),
+            "truncated_chunks": sum(n > limit for n in tokens),
+            "chunk_ms": round(chunk_s * 1000, 1),
+            "encode_s": round(encode_s, 3),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CV chunking benchmark")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--corpus", help="directory of CV .txt files (default: built-in samples)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for key, value in benchmark(args.corpus).items():
+            print(f"{key}: {value}")
+    else:
+        parser.print_help()
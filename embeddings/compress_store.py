@@ -0,0 +1,268 @@
+# compressed vector storage: accuracy check and conversion of existing files
+#
+#   python -m embeddings.compress_store check [--kinds fp16,sq8,pq] [--synthetic]
+#   python -m embeddings.compress_store convert --kind sq8 [--dry-run]
+#
+# New segments are written as VECTOR_STORAGE (flat / fp16 / sq8). convert
+# re-encodes existing .index files (shard segments and per-job files) in
+# place: same file names, same vector ids, so metadata is untouched.
+# Writers only append to segments of the VECTOR_STORAGE kind, so a
+# converted newest segment is sealed and the next ingest opens a new one.
+# Both commands measure what the encoding does to compute_score and
+# refuse (check: exit 1, convert: skip the file) past the accuracy gate;
+# tests/test_compress_store.py holds fp16 and sq8 to the same gate.
+import os
+import sys
+import argparse
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from embeddings.embeddings import INDICES_DIR, _atomic_write_index, get_metadata_store
+from embeddings.file_lock import file_lock
+from embeddings.index_factory import build_storage_index, storage_kind
+from embeddings.store_maintenance import _read_vectors, index_lock_path
+
+# accuracy gate: largest allowed change of a 0-100 score, and the lowest
+# allowed cosine between a stored vector and its decoded version
+MAX_SCORE_DELTA = float(os.getenv("VECTOR_MAX_SCORE_DELTA", "1.0"))
+MIN_COSINE = float(os.getenv("VECTOR_MIN_COSINE", "0.98"))
+
+SCORING_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RAG and Scoring")
+
+# (JD vector, positions of its candidates' chunks, candidate label per chunk)
+Group = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _score_module():
+    """score.py of the RAG service (not a package: the folder name has spaces)."""
+    if SCORING_DIR not in sys.path:
+        sys.path.append(SCORING_DIR)
+    import score
+
+    return score
+
+
+def vector_fidelity(original: np.ndarray, decoded: np.ndarray) -> dict:
+    """Cosine between every stored vector and its decoded version."""
+    cos = np.sum(original * decoded, axis=1) / (
+        np.linalg.norm(original, axis=1) * np.linalg.norm(decoded, axis=1) + 1e-12
+    )
+    return {"min_cosine": round(float(cos.min()), 5), "mean_cosine": round(float(cos.mean()), 5)}
+
+
+def score_drift(original: np.ndarray, decoded: np.ndarray, groups: List[Group], k: int = 10) -> dict:
+    """
+    compute_score of every (JD, candidate) pair in groups, from the
+    original vs the decoded chunk vectors: largest / mean absolute change
+    (0-100 score points) and how much of each JD's top 10 survives.
+    """
+    score = _score_module()
+    deltas, overlaps = [], []
+    for jd, positions, labels in groups:
+        n_groups = int(labels.max()) + 1
+        before = score.compute_scores_grouped(jd, original[positions], labels, n_groups, k)
+        after = score.compute_scores_grouped(jd, decoded[positions], labels, n_groups, k)
+        deltas.append(np.abs(after - before))
+
+        ranked = np.flatnonzero(before > 0)  # zero scores tie, their order means nothing
+        if len(ranked):
+            top = min(10, len(ranked))
+            top_before = set(ranked[np.argsort(-before[ranked], kind="stable")[:top]])
+            top_after = set(np.argsort(-after, kind="stable")[:top])
+            overlaps.append(len(top_before & top_after) / top)
+
+    if not deltas:
+        return {"pairs": 0, "max_score_delta": 0.0, "mean_score_delta": 0.0, "top10_overlap": None}
+    deltas = np.concatenate(deltas)
+    return {
+        "pairs": int(len(deltas)),
+        "max_score_delta": round(float(deltas.max()), 3),
+        "mean_score_delta": round(float(deltas.mean()), 4),
+        "top10_overlap": round(float(np.mean(overlaps)), 4) if overlaps else None,
+    }
+
+
+def passes_gate(result: dict, max_score_delta: float = MAX_SCORE_DELTA, min_cosine: float = MIN_COSINE) -> bool:
+    return result["min_cosine"] >= min_cosine and result["max_score_delta"] <= max_score_delta
+
+
+def _groups_for_rows(rows: list, positions: np.ndarray) -> List[Group]:
+    """
+    One group per (company, job) of CV rows, scored against that job's
+    stored JD; positions[i] is where rows[i]'s vector sits. Jobs without
+    a JD are left out.
+    """
+    store = get_metadata_store()
+    by_job = defaultdict(list)
+    for i, row in enumerate(rows):
+        if row["type"] == "CV":
+            by_job[(row["company_id"], row["job_id"])].append(i)
+
+    groups = []
+    for (company_id, job_id), members in by_job.items():
+        jd_row = store.latest(company_id, job_id, "JD")
+        if jd_row is None or not os.path.exists(os.path.join(INDICES_DIR, jd_row["index_name"])):
+            continue
+        jd = _read_vectors([jd_row])[0]
+        candidates = {}
+        labels = np.array(
+            [candidates.setdefault(rows[i]["candidate_id"], len(candidates)) for i in members], dtype=np.int64
+        )
+        groups.append((jd, positions[members], labels))
+    return groups
+
+
+def _synthetic_set(n_candidates: int = 2000, chunks: int = 5, dim: int = 384, n_jds: int = 40,
+                   seed: int = 0) -> Tuple[np.ndarray, List[Group]]:
+    """
+    Candidates whose chunks share a topic, with candidate-specific noise,
+    and JDs near one topic each, so scores spread over the whole 0-100
+    range instead of sitting at 0.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((50, dim)).astype(np.float32)
+    labels = np.repeat(np.arange(n_candidates), chunks)
+    noise = rng.uniform(0.8, 3.0, n_candidates)[labels, None]
+    vectors = topics[rng.integers(0, 50, n_candidates)][labels] + noise * rng.standard_normal(
+        (len(labels), dim)
+    ).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    jds = topics[rng.integers(0, 50, n_jds)] + 0.6 * rng.standard_normal((n_jds, dim)).astype(np.float32)
+    positions = np.arange(len(labels))
+    return vectors, [(jd, positions, labels) for jd in jds]
+
+
+def check(kinds=("fp16", "sq8", "pq"), synthetic: bool = False, max_score_delta: float = MAX_SCORE_DELTA,
+          min_cosine: float = MIN_COSINE) -> List[dict]:
+    """
+    Encode the store's CV vectors (or a synthetic set) as every kind and
+    report size, vector fidelity, score drift and whether the kind passes
+    the accuracy gate.
+    """
+    if synthetic:
+        vectors, groups = _synthetic_set()
+        source = "synthetic"
+    else:
+        rows = [row for row in get_metadata_store().rows_by_index("") if row["type"] == "CV"]
+        if not rows:
+            raise SystemExit("No CV vectors in the store; use --synthetic")
+        vectors = _read_vectors(rows)
+        groups = _groups_for_rows(rows, np.arange(len(rows)))
+        source = "store"
+
+    flat_bytes = vectors.shape[1] * 4
+    results = []
+    for kind in kinds:
+        try:
+            index = build_storage_index(kind, vectors)
+        except ValueError as e:
+            results.append({"kind": kind, "source": source, "skipped": str(e)})
+            continue
+        decoded = index.reconstruct_n(0, index.ntotal)
+        nbytes = len(faiss.serialize_index(index)) / len(vectors)
+        result = {
+            "kind": kind,
+            "source": source,
+            "vectors": len(vectors),
+            "bytes_per_vector": round(nbytes, 1),
+            "vs_flat": round(nbytes / flat_bytes, 3),
+            **vector_fidelity(vectors, decoded),
+            **score_drift(vectors, decoded, groups),
+        }
+        result["passed"] = passes_gate(result, max_score_delta, min_cosine)
+        results.append(result)
+    return results
+
+
+def convert(kind: str, max_score_delta: float = MAX_SCORE_DELTA, min_cosine: float = MIN_COSINE,
+            dry_run: bool = False, names: Optional[List[str]] = None) -> dict:
+    """
+    Re-encode store files (all, or names) as kind, in place.
+
+    Each file is encoded outside the lock (pq training can take a while),
+    checked against the accuracy gate with the scores of its own rows, then
+    written under the writers' lock, first adding any vectors appended in
+    the meantime. Files failing the gate, or too small to train pq, are
+    skipped. JD files are gated on vector fidelity only.
+    """
+    store = get_metadata_store()
+    converted, skipped = [], []
+    for name in names or sorted(os.listdir(INDICES_DIR)):
+        path = os.path.join(INDICES_DIR, name)
+        if not name.endswith(".index") or name.startswith("ann_") or not os.path.exists(path):
+            continue
+        index = faiss.read_index(path)
+        current_kind = storage_kind(index)
+        n = int(index.ntotal)
+        if current_kind == kind or n == 0:
+            continue
+
+        original = index.reconstruct_n(0, n)
+        try:
+            new = build_storage_index(kind, original)
+        except ValueError as e:
+            skipped.append({"file": name, "vectors": n, "reason": str(e)})
+            continue
+        decoded = new.reconstruct_n(0, n)
+
+        rows = [row for row in store.rows_by_index(name) if row["vector_id"] < n]
+        positions = np.array([row["vector_id"] for row in rows], dtype=np.int64)
+        entry = {
+            "file": name,
+            "from": current_kind,
+            "vectors": n,
+            **vector_fidelity(original, decoded),
+            **score_drift(original, decoded, _groups_for_rows(rows, positions)),
+        }
+        if not passes_gate(entry, max_score_delta, min_cosine):
+            skipped.append({**entry, "reason": "accuracy gate"})
+            continue
+        if dry_run:
+            converted.append(entry)
+            continue
+
+        entry["bytes_before"] = os.path.getsize(path)
+        with file_lock(index_lock_path(name)):
+            if not os.path.exists(path):
+                continue  # collected meanwhile
+            current = faiss.read_index(path)
+            if current.ntotal > n:
+                new.add(current.reconstruct_n(n, current.ntotal - n))
+            _atomic_write_index(new, path)
+        entry["bytes_after"] = os.path.getsize(path)
+        converted.append(entry)
+
+    return {"kind": kind, "dry_run": dry_run, "converted": converted, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compressed vector storage: accuracy check and conversion")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_check = sub.add_parser("check", help="measure score drift per storage kind; exit 1 past the gate")
+    p_check.add_argument("--kinds", default="fp16,sq8,pq")
+    p_check.add_argument("--synthetic", action="store_true", help="synthetic vectors instead of the store")
+    p_convert = sub.add_parser("convert", help="re-encode existing .index files in place")
+    p_convert.add_argument("--kind", required=True, help="flat | fp16 | sq8 | pq")
+    p_convert.add_argument("--dry-run", action="store_true", help="measure only, write nothing")
+    p_convert.add_argument("files", nargs="*", help="file names under vector_store/indices (default: all)")
+    for p in (p_check, p_convert):
+        p.add_argument("--max-score-delta", type=float, default=MAX_SCORE_DELTA, help="0-100 score points")
+        p.add_argument("--min-cosine", type=float, default=MIN_COSINE)
+    args = parser.parse_args()
+
+    if args.command == "check":
+        results = check(args.kinds.split(","), args.synthetic, args.max_score_delta, args.min_cosine)
+        for result in results:
+            print(result)
+        if any(result.get("passed") is False for result in results):
+            raise SystemExit(1)
+    else:
+        result = convert(args.kind, args.max_score_delta, args.min_cosine, args.dry_run, args.files or None)
+        for entry in result["converted"]:
+            print("converted:", entry)
+        for entry in result["skipped"]:
+            print("skipped:", entry)
@@ -0,0 +1,105 @@
+# on-disk embedding cache: float32 matrix file + hash -> row index
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+
+def normalize_chunk(text: str) -> str:
+    """Whitespace-insensitive form of a chunk, used for cache keys."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by sha256(model name + normalized chunk text).
+
+    Vectors live in one append-only float32 file read through np.memmap;
+    a small SQLite table maps each key to its row. The SQLite write
+    transaction also serializes appends across processes.
+    """
+
+    def __init__(self, root: str, dim: int):
+        self.root = root
+        self.dim = dim
+        self.vectors_path = os.path.join(root, "vectors.f32")
+        self.db_path = os.path.join(root, "keys.sqlite")
+        self._lock = threading.Lock()
+        self._mmap = None
+
+        os.makedirs(root, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS info (name TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT OR IGNORE INTO info (name, value) VALUES ('dim', ?)", (str(dim),))
+            stored_dim = int(conn.execute("SELECT value FROM info WHERE name = 'dim'").fetchone()[0])
+        if stored_dim != dim:
+            raise RuntimeError(f"Embedding cache dim {stored_dim} != model dim {dim}")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{normalize_chunk(text)}".encode("utf-8")).hexdigest()
+
+    def _rows_mapped(self) -> int:
+        return 0 if self._mmap is None else self._mmap.shape[0]
+
+    def _matrix(self, needed_rows: int) -> np.ndarray:
+        """Memory-mapped view of the vectors file covering needed_rows."""
+        with self._lock:
+            if self._rows_mapped() < needed_rows:
+                n = os.path.getsize(self.vectors_path) // (self.dim * 4)
+                self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+            return self._mmap
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for whichever keys are present."""
+        if not keys:
+            return {}
+        found = {}
+        with self._connect() as conn:
+            unique = list(set(keys))
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                marks = ",".join("?" * len(part))
+                found.update(conn.execute(f"SELECT key, row FROM rows WHERE key IN ({marks})", part))
+        if not found:
+            return {}
+
+        matrix = self._matrix(max(found.values()) + 1)
+        return {key: np.array(matrix[row]) for key, row in found.items()}
+
+    def put_many(self, keys: List[str], vectors: np.ndarray) -> None:
+        """Append vectors for keys that are not cached yet."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not keys:
+            return
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # cross-process append lock
+            new = {}
+            for key, vec in zip(keys, vectors):
+                if key not in new and conn.execute("SELECT 1 FROM rows WHERE key = ?", (key,)).fetchone() is None:
+                    new[key] = vec
+            if not new:
+                return
+
+            # Start right after the last committed row; drops any bytes a
+            # crashed writer left behind without registering them.
+            first_row = conn.execute("SELECT COALESCE(MAX(row), -1) + 1 FROM rows").fetchone()[0]
+            mode = "r+b" if os.path.exists(self.vectors_path) else "wb"
+            with open(self.vectors_path, mode) as f:
+                f.truncate(first_row * self.dim * 4)
+                f.seek(first_row * self.dim * 4)
+                f.write(np.stack(list(new.values())).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            conn.executemany(
+                "INSERT INTO rows (key, row) VALUES (?, ?)",
+                [(key, first_row + i) for i, key in enumerate(new)],
+            )
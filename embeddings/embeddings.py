@@ -1,38 +1,114 @@
 # embeddings + vector DB implementation
 import os
-import json  # for output
+import hashlib  # for content-addressing JD text
 import time  # for timestamps
 import uuid  # for giving ids for embeddings
-from typing import Tuple, Dict, Any, List  # for conversions
+import threading  # for the lazy model singleton
+import zlib  # stable company -> shard hash
+from typing import Tuple, Dict, Any, Iterable, Iterator, List  # for conversions
 
 import numpy as np
-from sentence_transformers import SentenceTransformer  # for loading model
 import faiss  # vector db
 
-# loading model
+from embeddings.chunker import iter_chunks
+from embeddings.embedding_cache import EmbeddingCache
+from embeddings.metadata_store import MetadataStore
+from embeddings.file_lock import file_lock
+from embeddings.index_factory import STORAGE_KIND, create_storage_index, storage_kind
+
+# model is loaded lazily on first use (see get_model / warmup)
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-model = SentenceTransformer(MODEL_NAME)
+_model = None
+_model_lock = threading.Lock()
+MODEL_LOAD_SECONDS = None  # set once the model has been loaded
 
 # storage destinations
 STORE_ROOT = "vector_store"  # main folder which stores all vector related data
 
 INDICES_DIR = os.path.join(STORE_ROOT, "indices")
-META_DIR = os.path.join(STORE_ROOT, "metadata")
-os.makedirs(INDICES_DIR, exist_ok=True)
-os.makedirs(META_DIR, exist_ok=True)
+METADATA_DB = os.path.join(STORE_ROOT, "metadata.db")
+_metadata_store = None
+
+# vectors live in a few shard files per type instead of one file per job;
+# a shard is a series of append-only segments (see store_maintenance.py)
+SHARD_COUNT = int(os.getenv("VECTOR_SHARDS", "8"))
+SEGMENT_MAX_VECTORS = int(os.getenv("VECTOR_SEGMENT_MAX", "10000"))
+
+# chunk-level embedding cache (see embedding_cache.py)
+EMBED_CACHE_DIR = os.path.join(STORE_ROOT, "embedding_cache")
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") == "1"
+# chunks handed to the model per call when chunks are streamed in
+# (the model still sorts them by length into batch_size batches)
+EMBED_STREAM_CHUNKS = int(os.getenv("EMBED_STREAM_CHUNKS", "256"))
+_embed_cache = None
+
+
+
+def get_model():
+    """
+    The SentenceTransformer, loaded on first call.
+    Thread-safe: concurrent first calls load it only once.
+    """
+    global _model, MODEL_LOAD_SECONDS
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer  # heavy import, deferred
+
+                start = time.perf_counter()
+                _model = SentenceTransformer(MODEL_NAME)
+                MODEL_LOAD_SECONDS = time.perf_counter() - start
+    return _model
+
+
+def warmup() -> float:
+    """
+    Load the model and run one tiny encode so the first real request
+    does not pay for it. Returns the seconds spent.
+    """
+    start = time.perf_counter()
+    get_model().encode(["warmup"], show_progress_bar=False)
+    return time.perf_counter() - start
+
+
+def _ensure_store_dirs() -> None:
+    os.makedirs(INDICES_DIR, exist_ok=True)
 
-# Given a company, job, and type (CV/JD), this determines the exact index file and metadata file paths used to store and retrieve that data.
 
+def get_metadata_store() -> MetadataStore:
+    """Shared SQLite metadata store (created on first use)."""
+    global _metadata_store
+    if _metadata_store is None:
+        _ensure_store_dirs()
+        _metadata_store = MetadataStore(METADATA_DB)
+    return _metadata_store
 
-def get_paths(company_id: int, job_id: int, data_type: str) -> Tuple[str, str]:
-    """ Build index and metadata paths for a (company, job, type) pair. 
-    data_type must be "CV" or "JD". """
+# Every company maps to one shard per type; the shard's segment files
+# hold the vectors of all its jobs, tagged through the metadata store.
+
+
+def shard_of(company_id) -> int:
+    """Shard a company's vectors live in (stable across processes)."""
+    return zlib.crc32(str(company_id).encode("utf-8")) % SHARD_COUNT
+
+
+def shard_prefix(data_type: str, shard: int) -> str:
     assert data_type in ("CV", "JD")
-    index_name = f"company_{company_id}_job_{job_id}_{data_type.lower()}.index"
-    meta_name = f"company_{company_id}_job_{job_id}_{data_type.lower()}.json"
-    return (os.path.join(INDICES_DIR, index_name),
-            os.path.join(META_DIR, meta_name),
-            )
+    return f"shard_{data_type.lower()}_{shard:03d}_"
+
+
+def shard_lock_path(data_type: str, shard: int) -> str:
+    """Path the shard's writers lock on (see file_lock)."""
+    return os.path.join(INDICES_DIR, shard_prefix(data_type, shard).rstrip("_"))
+
+
+def shard_segments(data_type: str, shard: int) -> List[str]:
+    """Segment file names of one shard, oldest first."""
+    prefix = shard_prefix(data_type, shard)
+    return sorted(
+        name for name in os.listdir(INDICES_DIR)
+        if name.startswith(prefix) and name.endswith(".index")
+    )
 
 # inorder to use indexing, we need to normalize vectors and convet into float32
 
@@ -45,34 +121,99 @@ def l2_normalize(vec: np.ndarray) -> np.ndarray:
         return vec
     return (vec / norm).astype(np.float32)
 
+
+def l2_normalize_rows(mat: np.ndarray) -> np.ndarray:
+    """L2-normalize every row of a (n, dim) matrix in one pass (float32)."""
+    mat = np.array(mat, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (mat / norms).astype(np.float32)
+
 # EMBEDDING + CHUNKING HELPERS
 
 
-def embed_text(text: str) -> List[float]:
-    """Generate embedding and return as Python list."""
-    emb = model.encode(text)
-    return emb.tolist()
+def get_embed_cache() -> EmbeddingCache:
+    """Shared on-disk embedding cache (created on first use)."""
+    global _embed_cache
+    if _embed_cache is None:
+        _embed_cache = EmbeddingCache(EMBED_CACHE_DIR, get_model().get_sentence_embedding_dimension())
+    return _embed_cache
 
 
-def chunk_text(text: str, chunk_size: int = 80, overlap: int = 20, ) -> List[str]:
-    """ Word-based chunking with overlap. Designed for CVs. """
-    words = text.split()
-    chunks = []
-    i = 0
-    while i < len(words):
-        chunk_words = words[i: i + chunk_size]
-        chunks.append(" ".join(chunk_words))
-        i += chunk_size - overlap
-    return chunks
+def embed_text(text: str) -> List[float]:
+    """Generate embedding and return as Python list."""
+    return embed_texts([text])[0].tolist()
 
 
-def make_metadata(company_id: int, job_id: int, data_type: str, text_snippet: str, chunk_id: int = None, ) -> Dict[str, Any]:
-    """Metadata for one embedding."""
+def _encode(texts: List[str], batch_size: int) -> np.ndarray:
+    """One batched model call."""
+    embs = get_model().encode(
+        list(texts),
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(embs, dtype=np.float32)
+
+
+def embed_texts(texts: List[str], batch_size: int = 32) -> np.ndarray:
+    """ Encode many texts with ONE batched model call.
+    Chunks already in the embedding cache are looked up, not re-encoded.
+    Returns a (len(texts), dim) float32 matrix. """
+    dim = get_model().get_sentence_embedding_dimension()
+    if not texts:
+        return np.zeros((0, dim), dtype=np.float32)
+    if not EMBED_CACHE_ENABLED:
+        return _encode(texts, batch_size)
+
+    cache = get_embed_cache()
+    keys = [cache.make_key(MODEL_NAME, text) for text in texts]
+    cached = cache.get_many(keys)
+
+    out = np.empty((len(texts), dim), dtype=np.float32)
+    missing = []
+    for i, key in enumerate(keys):
+        if key in cached:
+            out[i] = cached[key]
+        else:
+            missing.append(i)
+
+    if missing:
+        embs = _encode([texts[i] for i in missing], batch_size)
+        out[missing] = embs
+        cache.put_many([keys[i] for i in missing], embs)
+    return out
+
+
+def embed_chunk_stream(chunks: Iterable[str], batch_size: int = 32,
+                       stream_chunks: int = EMBED_STREAM_CHUNKS) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """ Encode chunks while they are still being produced.
+    Every stream_chunks chunks pulled from the iterator (and the rest at the
+    end) go through embed_texts; yields (chunks, embeddings) per call. """
+    batch: List[str] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= stream_chunks:
+            yield batch, embed_texts(batch, batch_size)
+            batch = []
+    if batch:
+        yield batch, embed_texts(batch, batch_size)
+
+
+def chunk_text(text: str, max_tokens: int = None, overlap_tokens: int = None, ) -> List[str]:
+    """ Token-aware, section-aware chunking (see chunker.iter_chunks). Designed for CVs.
+    Chunks fill the model's token budget without being truncated by it. """
+    return list(iter_chunks(text, max_tokens, overlap_tokens))
+
+
+def make_metadata(company_id: str, job_id: str, data_type: str, text_snippet: str, chunk_id: int = None, candidate_id: str = None, ) -> Dict[str, Any]:
+    """Metadata for one embedding. Ids are strings (Mongo ObjectIds, "temp-company-..." placeholders)."""
     return {
-        "company_id": int(company_id),
-        "job_id": int(job_id),
+        "company_id": str(company_id),
+        "job_id": str(job_id),
         "type": data_type,  # "CV" or "JD"
         "chunk_id": chunk_id,  # None for JD
+        "candidate_id": None if candidate_id is None else str(candidate_id),  # None for JD
         "created_at": int(time.time()),
         "embed_id": str(uuid.uuid4()),
         "snippet": text_snippet[:240],
@@ -81,10 +222,88 @@ def make_metadata(company_id: int, job_id: int, data_type: str, text_snippet: st
 
 
 def _create_faiss_index(dim: int):
-    """ Flat inner-product index.
+    """ Inner-product segment index, stored as VECTOR_STORAGE (flat float32 by default,
+       fp16 / sq8 to shrink disk and RAM; pq segments only come from compress_store convert).
        Vectors are L2-normalized before add,
          so IP ≈ cosine similarity. """
-    return faiss.IndexFlatIP(dim)
+    if STORAGE_KIND == "pq":
+        raise ValueError("VECTOR_STORAGE=pq needs training; write fp16/sq8 and run compress_store convert --kind pq")
+    return create_storage_index(STORAGE_KIND, dim)
+
+
+def _atomic_write_index(index, path: str) -> None:
+    """Write an index to a temp file and rename it over path."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        faiss.write_index(index, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the model name + text; changes whenever the vector would."""
+    return hashlib.sha256(f"{MODEL_NAME}\n{text}".encode("utf-8")).hexdigest()
+
+
+def _write_to_shard(vectors: np.ndarray, data_type: str, shard: int, fresh: bool = False) -> List[Tuple[str, int]]:
+    """
+    Append normalized vectors to the shard's newest segment, opening a
+    new segment once it holds SEGMENT_MAX_VECTORS (or right away when
+    fresh=True). The caller holds the shard lock.
+
+    Only the newest segment is ever rewritten (and only while it is of
+    the VECTOR_STORAGE kind); full ones stay untouched, so readers keep
+    them cached. Returns (index_name, vector_id) per
+    vector, vector_id being the row position in that segment.
+    """
+    dim = vectors.shape[1]
+    prefix = shard_prefix(data_type, shard)
+    segments = shard_segments(data_type, shard)
+    seq = int(segments[-1][len(prefix):-len(".index")]) if segments else -1
+
+    index = None
+    if segments and not fresh:
+        index = faiss.read_index(os.path.join(INDICES_DIR, segments[-1]))
+        if index.d != dim:
+            raise RuntimeError(
+                f"Index dim {index.d} != embedding dim {dim}"
+            )
+        # a segment converted to another storage kind (compress_store) is
+        # sealed: pq codebooks, for one, only fit the vectors they saw
+        if index.ntotal >= SEGMENT_MAX_VECTORS or storage_kind(index) != STORAGE_KIND:
+            index = None
+
+    placements = []
+    start = 0
+    while start < len(vectors):
+        if index is None:
+            seq += 1
+            index = _create_faiss_index(dim)
+        index_name = f"{prefix}{seq:06d}.index"
+        take = min(len(vectors) - start, SEGMENT_MAX_VECTORS - int(index.ntotal))
+        first_id = int(index.ntotal)
+
+        index.add(vectors[start:start + take])
+        _atomic_write_index(index, os.path.join(INDICES_DIR, index_name))
+        placements.extend((index_name, first_id + i) for i in range(take))
+        start += take
+        index = None
+    return placements
+
+
+def _after_ingest(data_type: str, shard: int) -> None:
+    """Promote the shard to an ANN index once it is big enough (background, see schedule_ann)."""
+    from embeddings import store_maintenance  # imports this module
+
+    if not store_maintenance.ANN_AUTO:
+        return
+    try:
+        store_maintenance.schedule_ann(data_type, shard)
+    except Exception as e:
+        # maintenance must never fail an ingest
+        print(f"ANN scheduling failed for {data_type} shard {shard}: {e}")
 
 
 def store_embedding(
@@ -94,41 +313,78 @@ def store_embedding(
     """
     Store one embedding into FAISS and append metadata.
     """
-    company_id = metadata["company_id"]
-    job_id = metadata["job_id"]
-    data_type = metadata["type"]
+    return store_embeddings(np.array([embedding], dtype=np.float32), [metadata])
 
-    index_path, meta_path = get_paths(company_id, job_id, data_type)
-    dim = len(embedding)
-
-    # Load or create index
-    if os.path.exists(index_path):
-        index = faiss.read_index(index_path)
-        if index.d != dim:
-            raise RuntimeError(
-                f"Index dim {index.d} != embedding dim {dim}"
-            )
-    else:
-        index = _create_faiss_index(dim)
 
-    # Normalize and add vector
-    vec = l2_normalize(np.array(embedding, dtype=np.float32))
-    vec = np.expand_dims(vec, axis=0)
-    index.add(vec)
+def store_embeddings(
+    embeddings: np.ndarray,
+    metadata_list: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Store a batch of embeddings of ONE (company, job, type).
 
-    faiss.write_index(index, index_path)
+    Rows are normalized as a matrix and appended to the company's shard
+    with a single index.add per segment, under the shard's file lock.
+    """
+    embeddings = np.array(embeddings, dtype=np.float32, ndmin=2)
+    if len(embeddings) != len(metadata_list):
+        raise ValueError(
+            f"{len(embeddings)} embeddings but {len(metadata_list)} metadata entries"
+        )
+    if not metadata_list:
+        raise ValueError("Nothing to store")
+
+    first = metadata_list[0]
+    company_id = first["company_id"]
+    job_id = first["job_id"]
+    data_type = first["type"]
+    for meta in metadata_list:
+        if (meta["company_id"], meta["job_id"], meta["type"]) != (company_id, job_id, data_type):
+            raise ValueError("All metadata in a batch must share company, job and type")
+
+    _ensure_store_dirs()
+    shard = shard_of(company_id)
+    vectors = l2_normalize_rows(embeddings)
+    store = get_metadata_store()
+
+    # One writer per shard at a time (threads, processes, workers): the
+    # segment read-modify-write and the metadata insert happen under the
+    # same lock, so concurrent ingests cannot drop vectors.
+    with file_lock(shard_lock_path(data_type, shard)):
+        # Record where every vector landed so readers can pull a single
+        # candidate's rows without scanning the shard.
+        placements = _write_to_shard(vectors, data_type, shard)
+        for meta, (index_name, vector_id) in zip(metadata_list, placements):
+            meta["index_name"] = index_name
+            meta["vector_id"] = vector_id
+
+        # Index first, metadata second: a crash in between leaves rows no
+        # metadata points at (dropped by compaction), never metadata
+        # pointing at rows that do not exist.
+        store.append(metadata_list)
+
+    _after_ingest(data_type, shard)
+    return {
+        "status": "success",
+        "index_path": os.path.join(INDICES_DIR, placements[-1][0]),
+        "meta_path": store.path,
+        "total_vectors": store.count(company_id, job_id, data_type),
+    }
 
-    # Append metadata
-    if os.path.exists(meta_path):
-        with open(meta_path, "r") as f:
-            meta_list = json.load(f)
-    else:
-        meta_list = []
-    meta_list.append(metadata)
 
-    with open(meta_path, "w") as f:
-        json.dump(meta_list, f)
-    return {"status": "success", "index_path": index_path, "meta_path": meta_path, "total_vectors": int(index.ntotal), }
+def _cv_chunk_metadata(company_id, job_id, candidate_id, chunks: List[str]) -> List[Dict[str, Any]]:
+    """Metadata for every chunk of one CV."""
+    return [
+        make_metadata(
+            company_id=company_id,
+            job_id=job_id,
+            data_type="CV",
+            text_snippet=chunk,
+            chunk_id=i,
+            candidate_id=candidate_id,
+        )
+        for i, chunk in enumerate(chunks)
+    ]
 
 
 def process_cv_application(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -139,38 +395,68 @@ def process_cv_application(payload: Dict[str, Any]) -> Dict[str, Any]:
     {
       "company_id": int,
       "job_id": int,
+      "candidate_id": str,
       "text": "<CV raw text>"
     }
 
     - CV is chunked
-    - Multiple embeddings per CV
-    - All chunks appended to job-level index
+    - Every chunk is tagged with candidate_id so it can be scored alone
+    - All chunks embedded in one batched model call
+    - All chunks appended to the company's shard with one write
     """
-    text = payload["text"]
-    company_id = payload["company_id"]
-    job_id = payload["job_id"]
+    return process_cv_applications([payload])[0]
 
-    chunks = chunk_text(text)
 
-    last_result = None
-    for i, chunk in enumerate(chunks):
-        emb = embed_text(chunk)
-        metadata = make_metadata(
-            company_id=company_id,
-            job_id=job_id,
-            data_type="CV",
-            text_snippet=chunk,
-            chunk_id=i,
-        )
-        last_result = store_embedding(emb, metadata)
+def process_cv_applications(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Bulk version of process_cv_application for many CVs at once.
 
-    return {
-        "status": "stored",
-        "chunks_added": len(chunks),
-        "index_path": last_result["index_path"],
-        "meta_path": last_result["meta_path"],
-        "total_vectors": last_result["total_vectors"],
-    }
+    - Chunks of all CVs stream from iter_chunks into batched model calls
+      (embed_chunk_stream), so encoding starts before the last CV is chunked
+    - Each (company, job) group is written to its shard once per batch
+    - Returns one result per payload, in input order
+    """
+    if not payloads:
+        return []
+    chunked: List[List[str]] = [[] for _ in payloads]
+
+    def stream() -> Iterator[str]:
+        for pos, payload in enumerate(payloads):
+            for chunk in iter_chunks(payload["text"]):
+                chunked[pos].append(chunk)
+                yield chunk
+            if not chunked[pos]:
+                raise ValueError(
+                    f"CV text is empty for company {payload['company_id']} job {payload['job_id']}"
+                )
+
+    all_embs = np.concatenate([embs for _, embs in embed_chunk_stream(stream())])
+
+    # group rows per (company, job) so every index is touched once
+    groups: Dict[Tuple[Any, Any], Dict[str, list]] = {}
+    offset = 0
+    for pos, (payload, chunks) in enumerate(zip(payloads, chunked)):
+        key = (payload["company_id"], payload["job_id"])
+        group = groups.setdefault(key, {"rows": [], "meta": [], "payloads": []})
+        group["rows"].extend(range(offset, offset + len(chunks)))
+        group["meta"].extend(
+            _cv_chunk_metadata(key[0], key[1], payload.get("candidate_id"), chunks)
+        )
+        group["payloads"].append(pos)
+        offset += len(chunks)
+
+    results: List[Dict[str, Any]] = [None] * len(payloads)
+    for group in groups.values():
+        stored = store_embeddings(all_embs[group["rows"]], group["meta"])
+        for pos in group["payloads"]:
+            results[pos] = {
+                "status": "stored",
+                "chunks_added": len(chunked[pos]),
+                "index_path": stored["index_path"],
+                "meta_path": stored["meta_path"],
+                "total_vectors": stored["total_vectors"],
+            }
+    return results
 
 
 def process_jd_creation(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -185,19 +471,24 @@ def process_jd_creation(payload: Dict[str, Any]) -> Dict[str, Any]:
     }
 
     - JD is NOT chunked
-    - Old JD is OVERWRITTEN
+    - Unchanged JD text (same content hash) is a no-op: no embed, no write
+    - Changed JD is appended to the shard and its row swapped in one transaction
     - Exactly one JD vector per job
     """
     text = payload["text"]
     company_id = payload["company_id"]
     job_id = payload["job_id"]
 
-    #  Reset old JD
-    index_path, meta_path = get_paths(company_id, job_id, "JD")
-    if os.path.exists(index_path):
-        os.remove(index_path)
-    if os.path.exists(meta_path):
-        os.remove(meta_path)
+    _ensure_store_dirs()
+    store = get_metadata_store()
+    jd_hash = content_hash(text)
+
+    # Skip the embed + rewrite when this exact JD is already stored
+    current = store.latest(company_id, job_id, "JD")
+    if current is not None and current["content_hash"] == jd_hash:
+        index_path = os.path.join(INDICES_DIR, current["index_name"])
+        if os.path.exists(index_path):
+            return {"status": "unchanged", "index_path": index_path, "meta_path": store.path, "total_vectors": 1, }
 
     emb = embed_text(text)
     metadata = make_metadata(
@@ -206,8 +497,19 @@ def process_jd_creation(payload: Dict[str, Any]) -> Dict[str, Any]:
         data_type="JD",
         text_snippet=text,
     )
+    metadata["content_hash"] = jd_hash
+
+    # Append the new JD vector and swap the job's JD row over to it in one
+    # transaction; readers see the old or the new JD, never none. The old
+    # vector becomes dead weight until the shard is compacted.
+    shard = shard_of(company_id)
+    with file_lock(shard_lock_path("JD", shard)):
+        [(index_name, vector_id)] = _write_to_shard(l2_normalize_rows([emb]), "JD", shard)
+        metadata["index_name"] = index_name
+        metadata["vector_id"] = vector_id
+        store.replace(company_id, job_id, "JD", [metadata])
 
-    return store_embedding(emb, metadata)
+    return {"status": "success", "index_path": os.path.join(INDICES_DIR, index_name), "meta_path": store.path, "total_vectors": 1, }
 
 
 # sample test
@@ -222,6 +524,7 @@ if __name__ == "__main__":
     cv_payload = {
         "company_id": 6,
         "job_id": 22,
+        "candidate_id": "sample-candidate",
         "text": "Strong Python backend engineer with Flask and Postgres experience. "
                 "Worked on scalable APIs, databases, and system design.",
     }
@@ -0,0 +1,232 @@
+# FAISS index factory for shard segments and the shard-level ANN search indices
+#
+#   python -m embeddings.index_factory --benchmark [--n 100000] [--queries 200]
+#
+# Segments hold the vectors scores are computed from: float32 by default,
+# or compressed (VECTOR_STORAGE, see compress_store.py). ANN indices only
+# speed up "search the whole pool" queries.
+import os
+import time
+import argparse
+from typing import Optional
+
+import numpy as np
+import faiss
+
+ANN_KINDS = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+ANN_KIND = os.getenv("VECTOR_ANN_KIND", "hnsw")
+# shards with fewer live vectors are searched exactly (no ANN index)
+ANN_MIN_VECTORS = int(os.getenv("VECTOR_ANN_MIN", "50000"))
+# rebuild (and retrain) once this fraction of vectors arrived after the last build
+ANN_RETRAIN_GROWTH = float(os.getenv("VECTOR_ANN_RETRAIN_GROWTH", "0.25"))
+
+HNSW_M = int(os.getenv("VECTOR_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("VECTOR_HNSW_EF_SEARCH", "128"))
+IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "16"))
+PQ_M = int(os.getenv("VECTOR_PQ_M", "48"))  # sub-quantizers; must divide the dim
+PQ_NBITS = 8
+
+# segment storage: flat (float32), fp16, sq8 (8 bits per component) or
+# pq (PQ_M bytes per vector; trained, so only by converting whole files)
+STORAGE_KINDS = ("flat", "fp16", "sq8", "pq")
+STORAGE_KIND = os.getenv("VECTOR_STORAGE", "flat")
+# sq8 needs no training: every component is quantized in [-SQ8_RANGE, SQ8_RANGE]
+# (normalized MiniLM vectors stay well inside +-0.3)
+SQ8_RANGE = float(os.getenv("VECTOR_SQ8_RANGE", "0.5"))
+PQ_MIN_VECTORS = 4 * 2 ** PQ_NBITS  # fewer training vectors give useless codebooks
+
+
+def ivf_nlist(n: int) -> int:
+    """~4*sqrt(n) lists, but at least 39 training points per centroid."""
+    return max(1, min(int(4 * np.sqrt(n)), n // 39))
+
+
+def create_index(kind: str, dim: int, n: int) -> faiss.Index:
+    """
+    Empty inner-product index of the given kind, sized for ~n vectors.
+    Every kind accepts add_with_ids (flat / HNSW are wrapped in an IDMap).
+    """
+    if kind == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return faiss.IndexIDMap2(index)
+
+    quantizer = faiss.IndexFlatIP(dim)
+    if kind == "ivf_flat":
+        return faiss.IndexIVFFlat(quantizer, dim, ivf_nlist(n), faiss.METRIC_INNER_PRODUCT)
+    if kind == "ivf_pq":
+        if dim % PQ_M:
+            raise ValueError(f"VECTOR_PQ_M={PQ_M} does not divide dim {dim}")
+        return faiss.IndexIVFPQ(quantizer, dim, ivf_nlist(n), PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+    raise ValueError(f"Unknown index kind: {kind} (expected one of {ANN_KINDS})")
+
+
+def train_index(index: faiss.Index, vectors: np.ndarray, max_samples: Optional[int] = None, seed: int = 0) -> None:
+    """
+    Training hook: IVF kinds learn their centroids (and PQ codebooks) from
+    a random sample of vectors, as does pq storage; flat and HNSW need
+    no training.
+    Retraining = building a fresh index, see store_maintenance.build_ann.
+    """
+    if index.is_trained:
+        return
+    if max_samples is None:
+        max_samples = max(256 * 39, faiss.extract_index_ivf(index).nlist * 64)
+    if len(vectors) > max_samples:
+        rng = np.random.default_rng(seed)
+        vectors = vectors[rng.choice(len(vectors), max_samples, replace=False)]
+    index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+
+
+def tune_index(index: faiss.Index, ef_search: int = HNSW_EF_SEARCH, nprobe: int = IVF_NPROBE) -> faiss.Index:
+    """Apply search-time knobs (HNSW efSearch, IVF nprobe); returns index."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = ef_search
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = nprobe
+    return index
+
+
+def build_index(kind: str, vectors: np.ndarray, ids: np.ndarray) -> faiss.Index:
+    """Create, train and fill an index of kind with normalized vectors under ids."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = create_index(kind, vectors.shape[1], len(vectors))
+    train_index(index, vectors)
+    index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    return tune_index(index)
+
+
+def create_storage_index(kind: str, dim: int) -> faiss.Index:
+    """
+    Empty segment index of a storage kind, ready for add (inner product).
+    pq has to be trained first, see build_storage_index.
+    """
+    if kind == "flat":
+        return faiss.IndexFlatIP(dim)
+    if kind == "fp16":
+        return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    if kind == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit_uniform, faiss.METRIC_INNER_PRODUCT)
+        # fixed range instead of training, so a fresh segment takes any first batch
+        faiss.copy_array_to_vector(np.array([-SQ8_RANGE, 2 * SQ8_RANGE], dtype=np.float32), index.sq.trained)
+        index.is_trained = True
+        return index
+    if kind == "pq":
+        if dim % PQ_M:
+            raise ValueError(f"VECTOR_PQ_M={PQ_M} does not divide dim {dim}")
+        return faiss.IndexPQ(dim, PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+    raise ValueError(f"Unknown storage kind: {kind} (expected one of {STORAGE_KINDS})")
+
+
+def build_storage_index(kind: str, vectors: np.ndarray) -> faiss.Index:
+    """Segment index of kind holding vectors at ids 0..n-1 (pq is trained on them)."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = create_storage_index(kind, vectors.shape[1])
+    if not index.is_trained:
+        if len(vectors) < PQ_MIN_VECTORS:
+            raise ValueError(f"{kind} needs at least {PQ_MIN_VECTORS} vectors to train, got {len(vectors)}")
+        train_index(index, vectors, max_samples=50_000)
+    index.add(vectors)
+    return index
+
+
+def storage_kind(index: faiss.Index) -> str:
+    """Storage kind of a segment index (flat / fp16 / sq8 / pq)."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    return "flat"
+
+
+def index_kind(index: faiss.Index) -> str:
+    """Kind name of an index built by build_index."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else faiss.downcast_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+# ----------------------------------------------------------------------
+# Recall vs latency benchmark
+# ----------------------------------------------------------------------
+def _synthetic(n: int, dim: int, n_clusters: int, seed: int) -> np.ndarray:
+    """Clustered unit vectors; closer to sentence embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    data = centers[rng.integers(0, n_clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def benchmark(n: int = 100_000, n_queries: int = 200, dim: int = 384, k: int = 10,
+              kinds=ANN_KINDS, oversample: int = 4) -> list:
+    """
+    Build every kind over the same vectors and compare recall@k against
+    the exact flat baseline, plus build time and per-query latency.
+    "rerank" recall is what the store returns: oversample * k ANN hits
+    re-scored exactly against the stored vectors.
+    """
+    vectors = _synthetic(n, dim, n_clusters=max(10, n // 1000), seed=0)
+    queries = _synthetic(n_queries, dim, n_clusters=max(10, n // 1000), seed=0)[:n_queries]
+    queries = queries + 0.05 * np.random.default_rng(1).standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    ids = np.arange(n, dtype=np.int64)
+
+    truth = None
+    results = []
+    for kind in kinds:
+        start = time.perf_counter()
+        index = build_index(kind, vectors, ids)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for q in queries:
+            index.search(q[None, :], k)
+        latency_ms = (time.perf_counter() - start) / n_queries * 1000
+
+        _, found = index.search(queries, k)
+        if truth is None:
+            if kind != "flat":
+                _, truth = build_index("flat", vectors, ids).search(queries, k)
+            else:
+                truth = found
+        _, pool = index.search(queries, k * oversample)
+        reranked = [
+            ids_[np.argsort(-(vectors[ids_] @ q))[:k]]
+            for q, ids_ in ((q, row[row >= 0]) for q, row in zip(queries, pool))
+        ]
+
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+        recall_rerank = np.mean([len(set(f) & set(t)) / k for f, t in zip(reranked, truth)])
+        results.append({
+            "kind": kind,
+            "build_s": round(build_s, 2),
+            "latency_ms": round(latency_ms, 3),
+            f"recall@{k}": round(float(recall), 4),
+            f"recall@{k}_rerank": round(float(recall_rerank), 4),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ANN index recall / latency benchmark")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--n", type=int, default=100_000, help="vectors in the index")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--kinds", default=",".join(ANN_KINDS))
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for row in benchmark(args.n, args.queries, kinds=args.kinds.split(",")):
+            print(row)
+    else:
+        parser.print_help()
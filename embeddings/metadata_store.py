@@ -0,0 +1,271 @@
+# SQLite metadata backend for the vector store
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+COLUMNS = (
+    "company_id", "job_id", "type", "index_name", "vector_id",
+    "candidate_id", "chunk_id", "embed_id", "content_hash", "created_at", "snippet",
+)
+
+
+class MetadataStore:
+    """
+    One row per stored vector, replacing the per-job JSON lists.
+
+    Appends are a single INSERT transaction (no rewrite of existing rows)
+    and lookups by job, candidate, vector id or embed id go through
+    indices. WAL mode lets readers run while a writer commits.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS vectors (
+                       id INTEGER PRIMARY KEY AUTOINCREMENT,
+                       company_id TEXT NOT NULL,
+                       job_id TEXT NOT NULL,
+                       type TEXT NOT NULL,
+                       index_name TEXT NOT NULL,
+                       vector_id INTEGER NOT NULL,
+                       candidate_id TEXT,
+                       chunk_id INTEGER,
+                       embed_id TEXT,
+                       content_hash TEXT,
+                       created_at INTEGER,
+                       snippet TEXT
+                   )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_job ON vectors(company_id, job_id, type, vector_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_candidate ON vectors(company_id, job_id, type, candidate_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_index ON vectors(index_name, vector_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_embed ON vectors(embed_id)")
+            # per-company change counters, so readers can tell in O(1) whether
+            # a cached view of a company's vectors is stale
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS scope_versions (
+                       company_id TEXT PRIMARY KEY,
+                       inserts INTEGER NOT NULL DEFAULT 0,
+                       deletes INTEGER NOT NULL DEFAULT 0
+                   )"""
+            )
+            conn.execute(
+                """CREATE TRIGGER IF NOT EXISTS trg_vectors_insert AFTER INSERT ON vectors BEGIN
+                       INSERT INTO scope_versions (company_id, inserts) VALUES (NEW.company_id, 1)
+                       ON CONFLICT(company_id) DO UPDATE SET inserts = inserts + 1;
+                   END"""
+            )
+            conn.execute(
+                """CREATE TRIGGER IF NOT EXISTS trg_vectors_delete AFTER DELETE ON vectors BEGIN
+                       INSERT INTO scope_versions (company_id, deletes) VALUES (OLD.company_id, 1)
+                       ON CONFLICT(company_id) DO UPDATE SET deletes = deletes + 1;
+                   END"""
+            )
+            # one ANN search index per shard at most (see store_maintenance.build_ann)
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS ann_indices (
+                       type TEXT NOT NULL,
+                       shard INTEGER NOT NULL,
+                       index_name TEXT NOT NULL,
+                       kind TEXT NOT NULL,
+                       max_row_id INTEGER NOT NULL,
+                       n_vectors INTEGER NOT NULL,
+                       built_at INTEGER NOT NULL,
+                       PRIMARY KEY (type, shard)
+                   )"""
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _row(meta: Dict[str, Any], index_name: str) -> tuple:
+        values = dict(meta, index_name=index_name)
+        values["company_id"] = str(values["company_id"])
+        values["job_id"] = str(values["job_id"])
+        return tuple(values.get(col) for col in COLUMNS)
+
+    def append(self, metadata_list: List[Dict[str, Any]], index_name: Optional[str] = None, conn=None) -> None:
+        """
+        Insert rows for vectors just added to index_name
+        (or to each meta's own "index_name" when none is given).
+        """
+        sql = f"INSERT INTO vectors ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        rows = [self._row(meta, index_name or meta["index_name"]) for meta in metadata_list]
+        if conn is not None:
+            conn.executemany(sql, rows)
+            return
+        with self._connect() as conn:
+            conn.executemany(sql, rows)
+
+    def replace(self, company_id, job_id, data_type: str, metadata_list: List[Dict[str, Any]], index_name: Optional[str] = None) -> None:
+        """Swap all rows of one (company, job, type) in one transaction."""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM vectors WHERE company_id = ? AND job_id = ? AND type = ?",
+                (str(company_id), str(job_id), data_type),
+            )
+            self.append(metadata_list, index_name, conn=conn)
+
+    def rows(self, company_id, job_id, data_type: str, candidate_ids: Optional[Iterable[str]] = None,
+             after_id: int = 0) -> List[Dict[str, Any]]:
+        """
+        Rows of one (company, job, type), or of every job of the company
+        when job_id is None; optionally only some candidates, or only rows
+        inserted after row id after_id.
+        Ordered by file and position so each file is read in one pass.
+        """
+        sql = "SELECT * FROM vectors WHERE company_id = ? AND type = ?"
+        params: list = [str(company_id), data_type]
+        if after_id:
+            sql += " AND id > ?"
+            params.append(int(after_id))
+        if job_id is not None:
+            sql += " AND job_id = ?"
+            params.append(str(job_id))
+        if candidate_ids is not None:
+            candidate_ids = list(candidate_ids)
+            if not candidate_ids:
+                return []
+            sql += f" AND candidate_id IN ({', '.join('?' * len(candidate_ids))})"
+            params += candidate_ids
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(sql + " ORDER BY index_name, vector_id", params)]
+
+    def rows_by_index(self, prefix: str, negate: bool = False, after_id: int = 0) -> List[Dict[str, Any]]:
+        """
+        Rows whose index_name starts (or, with negate, does not start) with
+        prefix, optionally only rows inserted after row id after_id.
+        """
+        op = "!=" if negate else "="
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(
+                f"SELECT * FROM vectors WHERE substr(index_name, 1, ?) {op} ? AND id > ? "
+                "ORDER BY index_name, vector_id",
+                (len(prefix), prefix, int(after_id)),
+            )]
+
+    def rows_by_ids(self, ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Rows by primary key; ids without a row (deleted vectors) are skipped."""
+        ids = [int(i) for i in ids]
+        out = []
+        with self._connect() as conn:
+            for start in range(0, len(ids), 900):  # stay under SQLite's variable limit
+                batch = ids[start:start + 900]
+                out.extend(dict(row) for row in conn.execute(
+                    f"SELECT * FROM vectors WHERE id IN ({', '.join('?' * len(batch))})", batch
+                ))
+        return out
+
+    def relocate(self, moves: Iterable[tuple]) -> None:
+        """Point rows at new files: moves are (row id, index_name, vector_id)."""
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE vectors SET index_name = ?, vector_id = ? WHERE id = ?",
+                [(index_name, int(vector_id), row_id) for row_id, index_name, vector_id in moves],
+            )
+
+    def index_counts(self) -> Dict[str, int]:
+        """Number of live rows per index file."""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT index_name, COUNT(*) FROM vectors GROUP BY index_name"))
+
+    def has_index(self, index_name: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT 1 FROM vectors WHERE index_name = ? LIMIT 1", (index_name,)
+            ).fetchone() is not None
+
+    def index_names(self, company_id, job_id=None) -> List[str]:
+        """Index files holding a company's (or one job's) vectors."""
+        sql = "SELECT DISTINCT index_name FROM vectors WHERE company_id = ?"
+        params: list = [str(company_id)]
+        if job_id is not None:
+            sql += " AND job_id = ?"
+            params.append(str(job_id))
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(sql, params)]
+
+    def delete_companies(self, prefix: str, created_before: int) -> int:
+        """
+        Delete rows of placeholder companies (company_id starting with
+        prefix, or empty) created before the given unix time.
+        """
+        with self._connect() as conn:
+            cur = conn.execute(
+                "DELETE FROM vectors WHERE (substr(company_id, 1, ?) = ? OR company_id = '') "
+                "AND COALESCE(created_at, 0) < ?",
+                (len(prefix), prefix, int(created_before)),
+            )
+            return cur.rowcount
+
+    def latest(self, company_id, job_id, data_type: str) -> Optional[Dict[str, Any]]:
+        """Most recently added row of one (company, job, type)."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM vectors WHERE company_id = ? AND job_id = ? AND type = ? ORDER BY id DESC LIMIT 1",
+                (str(company_id), str(job_id), data_type),
+            ).fetchone()
+        return None if row is None else dict(row)
+
+    def by_vector_id(self, index_name: str, vector_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM vectors WHERE index_name = ? AND vector_id = ?",
+                (index_name, int(vector_id)),
+            ).fetchone()
+        return None if row is None else dict(row)
+
+    def count(self, company_id, job_id, data_type: str) -> int:
+        """Rows of one (company, job, type), or of the whole company when job_id is None."""
+        sql = "SELECT COUNT(*) FROM vectors WHERE company_id = ? AND type = ?"
+        params: list = [str(company_id), data_type]
+        if job_id is not None:
+            sql += " AND job_id = ?"
+            params.append(str(job_id))
+        with self._connect() as conn:
+            return conn.execute(sql, params).fetchone()[0]
+
+    def scope_version(self, company_id) -> tuple:
+        """(inserts, deletes) ever made for a company; a cheap change token."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT inserts, deletes FROM scope_versions WHERE company_id = ?", (str(company_id),)
+            ).fetchone()
+        return (0, 0) if row is None else tuple(row)
+
+    def count_by_index(self, prefix: str, after_id: int = 0) -> int:
+        """Rows in files starting with prefix, optionally only those after row id after_id."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM vectors WHERE substr(index_name, 1, ?) = ? AND id > ?",
+                (len(prefix), prefix, int(after_id)),
+            ).fetchone()[0]
+
+    # ---- ANN search indices ----
+
+    def get_ann(self, data_type: str, shard: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM ann_indices WHERE type = ? AND shard = ?", (data_type, int(shard))
+            ).fetchone()
+        return None if row is None else dict(row)
+
+    def set_ann(self, data_type: str, shard: int, index_name: str, kind: str, max_row_id: int, n_vectors: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ann_indices VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (data_type, int(shard), index_name, kind, int(max_row_id), int(n_vectors), int(time.time())),
+            )
+
+    def drop_ann(self, data_type: str, shard: int) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM ann_indices WHERE type = ? AND shard = ?", (data_type, int(shard)))
+
+    def ann_index_names(self) -> List[str]:
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT index_name FROM ann_indices")]
@@ -0,0 +1,62 @@
+# one-off import of legacy per-job JSON metadata into the SQLite store
+#
+#   python -m embeddings.migrate_metadata [--store vector_store] [--delete-json]
+import os
+import re
+import json
+import argparse
+
+from embeddings.metadata_store import MetadataStore
+
+META_FILE_RE = re.compile(r"^company_(?P<company>.*)_job_(?P<job>.*)_(?P<type>cv|jd)\.json$")
+
+
+def migrate(store_root: str, delete_json: bool = False) -> dict:
+    """
+    Import every vector_store/metadata/*.json list into metadata.db.
+    A list's position i is the vector id of row i in the matching index.
+    Jobs already present in the store are skipped, so reruns are safe.
+    """
+    meta_dir = os.path.join(store_root, "metadata")
+    store = MetadataStore(os.path.join(store_root, "metadata.db"))
+    summary = {"files": 0, "rows": 0, "skipped": 0}
+
+    for name in sorted(os.listdir(meta_dir)):
+        match = META_FILE_RE.match(name)
+        if match is None:
+            continue
+
+        company_id, job_id = match["company"], match["job"]
+        data_type = match["type"].upper()
+        path = os.path.join(meta_dir, name)
+
+        if store.count(company_id, job_id, data_type):
+            summary["skipped"] += 1
+        else:
+            with open(path, "r") as f:
+                meta_list = json.load(f)
+
+            rows = []
+            for pos, meta in enumerate(meta_list):
+                row = dict(meta, company_id=company_id, job_id=job_id, type=data_type)
+                row.setdefault("vector_id", pos)
+                rows.append(row)
+
+            index_name = name[: -len(".json")] + ".index"
+            store.append(rows, index_name)
+            summary["files"] += 1
+            summary["rows"] += len(rows)
+
+        if delete_json:
+            os.remove(path)
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import legacy JSON metadata into metadata.db")
+    parser.add_argument("--store", default="vector_store", help="vector store root (default: vector_store)")
+    parser.add_argument("--delete-json", action="store_true", help="remove each JSON file once imported")
+    args = parser.parse_args()
+
+    print(migrate(args.store, delete_json=args.delete_json))
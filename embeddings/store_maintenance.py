@@ -0,0 +1,299 @@
+# vector store maintenance: consolidation, compaction, garbage collection
+#
+#   python -m embeddings.store_maintenance consolidate
+#   python -m embeddings.store_maintenance compact [--min-dead 0.2]
+#   python -m embeddings.store_maintenance gc [--temp-prefix temp-company-] [--temp-ttl-hours 24]
+#   python -m embeddings.store_maintenance ann [--kind hnsw] [--force]
+#
+# Safe to run while the services are up: every step takes the same shard
+# locks as the writers, and files are only deleted once no metadata row
+# points at them and they have been untouched for the grace period.
+# ANN promotion also runs by itself after ingests (schedule_ann).
+import os
+import time
+import argparse
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import faiss
+import numpy as np
+
+from embeddings.embeddings import (
+    INDICES_DIR,
+    SEGMENT_MAX_VECTORS,
+    SHARD_COUNT,
+    _atomic_write_index,
+    _write_to_shard,
+    get_metadata_store,
+    shard_lock_path,
+    shard_of,
+    shard_prefix,
+    shard_segments,
+)
+from embeddings.file_lock import file_lock
+from embeddings.index_factory import ANN_KIND, ANN_MIN_VECTORS, ANN_RETRAIN_GROWTH, build_index
+
+GC_GRACE_S = 3600  # readers may still hold rows pointing at a just-retired file
+
+# promote / retrain ANN indices after ingests (0 = only the "ann" command)
+ANN_AUTO = os.getenv("VECTOR_ANN_AUTO", "1") == "1"
+# seconds between two "is an ANN build due" checks of one shard, per process
+ANN_CHECK_INTERVAL_S = float(os.getenv("VECTOR_ANN_CHECK_S", "60"))
+
+_ann_lock = threading.Lock()
+_ann_checked: Dict[tuple, float] = {}  # (type, shard) -> monotonic time of the last check
+_ann_building: set = set()  # (type, shard) built right now by this process
+
+
+def _read_vectors(rows: List[Dict[str, Any]]) -> np.ndarray:
+    """Vectors behind rows (any mix of files), in rows order; each file is read once."""
+    by_file = defaultdict(list)
+    for pos, row in enumerate(rows):
+        by_file[row["index_name"]].append(pos)
+
+    out = None
+    for index_name, positions in by_file.items():
+        index = faiss.read_index(os.path.join(INDICES_DIR, index_name))
+        if out is None:
+            out = np.empty((len(rows), index.d), dtype=np.float32)
+        ids = np.array([rows[pos]["vector_id"] for pos in positions], dtype=np.int64)
+        out[positions] = index.reconstruct_batch(ids)
+    return out
+
+
+def index_lock_path(index_name: str) -> str:
+    """Lock writers of a store file take: its shard's for segments, its own for per-job files."""
+    if index_name.startswith("shard_"):
+        return os.path.join(INDICES_DIR, "_".join(index_name.split("_")[:3]))
+    return os.path.join(INDICES_DIR, index_name)
+
+
+def _move(rows: List[Dict[str, Any]], data_type: str, shard: int, fresh: bool) -> None:
+    """Copy rows' vectors into the shard and repoint the rows (shard lock held)."""
+    store = get_metadata_store()
+    # stored vectors are already normalized, so they are copied as-is
+    for start in range(0, len(rows), SEGMENT_MAX_VECTORS):
+        batch = rows[start:start + SEGMENT_MAX_VECTORS]
+        placements = _write_to_shard(_read_vectors(batch), data_type, shard, fresh=fresh and start == 0)
+        store.relocate(
+            (row["id"], index_name, vector_id)
+            for row, (index_name, vector_id) in zip(batch, placements)
+        )
+
+
+def consolidate() -> dict:
+    """
+    Move vectors still in per-job files (company_*_job_*_{cv,jd}.index)
+    into the company's shard. The old files are left for gc().
+    """
+    store = get_metadata_store()
+    groups = defaultdict(list)
+    for row in store.rows_by_index("shard_", negate=True):
+        groups[(row["type"], shard_of(row["company_id"]))].append(row)
+
+    moved = 0
+    for (data_type, shard), rows in sorted(groups.items()):
+        with file_lock(shard_lock_path(data_type, shard)):
+            _move(rows, data_type, shard, fresh=False)
+        moved += len(rows)
+        # moved rows keep their (old) row ids, below the ANN build watermark
+        if store.get_ann(data_type, shard) is not None:
+            build_ann(data_type, shard, force=True)
+    return {"rows_moved": moved, "shards": len(groups)}
+
+
+def compact(min_dead_ratio: float = 0.2) -> dict:
+    """
+    Rewrite shards in which at least min_dead_ratio of the stored vectors
+    no longer have metadata (replaced JDs, deleted companies, vectors of
+    crashed writes). Shards without dead vectors are never rewritten, even
+    with min_dead_ratio=0. Live vectors are copied into fresh segments; the
+    old segments are left for gc().
+    """
+    store = get_metadata_store()
+    compacted = []
+    for data_type in ("CV", "JD"):
+        for shard in range(SHARD_COUNT):
+            with file_lock(shard_lock_path(data_type, shard)):
+                live_counts = store.index_counts()
+                # segments no row points at any more (retired) are gc()'s
+                segments = [name for name in shard_segments(data_type, shard) if live_counts.get(name)]
+                if not segments:
+                    continue
+                total = sum(
+                    faiss.read_index(os.path.join(INDICES_DIR, name), faiss.IO_FLAG_MMAP).ntotal
+                    for name in segments
+                )
+                live = sum(live_counts.get(name, 0) for name in segments)
+                dead = total - live
+                if dead == 0 or dead / total < min_dead_ratio:
+                    continue
+
+                rows = store.rows_by_index(shard_prefix(data_type, shard))
+                _move(rows, data_type, shard, fresh=True)
+                compacted.append({"shard": shard_prefix(data_type, shard).rstrip("_"), "live": live, "dead": dead})
+    return {"compacted": compacted}
+
+
+def gc(temp_prefix: str = "temp-company-", temp_ttl_s: float = 24 * 3600, grace_s: float = GC_GRACE_S) -> dict:
+    """
+    Garbage-collect the store:
+
+    - metadata of placeholder companies (company_id starting with
+      temp_prefix, or empty) older than temp_ttl_s is deleted
+    - index files no metadata row points at (retired segments, per-job
+      files after consolidate(), orphans of deleted companies) and stale
+      temp files are removed once untouched for grace_s
+    """
+    store = get_metadata_store()
+    rows_deleted = store.delete_companies(temp_prefix, time.time() - temp_ttl_s) if temp_prefix else 0
+
+    referenced = set(store.index_counts()) | set(store.ann_index_names())
+    cutoff = time.time() - grace_s
+    removed = []
+    for name in sorted(os.listdir(INDICES_DIR)):
+        path = os.path.join(INDICES_DIR, name)
+        if name.endswith(".tmp"):
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed.append(name)
+            continue
+        if not name.endswith(".index") or name in referenced or os.path.getmtime(path) >= cutoff:
+            continue
+
+        # re-check under the writers' lock: the file may just have been appended to
+        is_segment = name.startswith("shard_")
+        with file_lock(index_lock_path(name)):
+            if store.has_index(name) or name in store.ann_index_names() or not os.path.exists(path):
+                continue
+            os.remove(path)
+        if not is_segment and os.path.exists(path + ".lock"):
+            os.remove(path + ".lock")
+        removed.append(name)
+
+    return {"rows_deleted": rows_deleted, "files_removed": len(removed)}
+
+
+def build_ann(data_type: str, shard: int, kind: str = ANN_KIND,
+              min_vectors: int = ANN_MIN_VECTORS, force: bool = False) -> dict:
+    """
+    Promote a shard to (or refresh) an ANN search index of kind.
+
+    - fewer than min_vectors live vectors: exact search is fine, any ANN
+      index is dropped (demotion)
+    - no index yet, a different kind, or more than ANN_RETRAIN_GROWTH new
+      vectors since the last build (or force): build and train a new one
+    - otherwise: keep the current index; vectors added since are searched
+      exactly by the reader until the next rebuild
+
+    ANN ids are metadata row ids, which survive compaction, so only new
+    rows need a rebuild. Training runs outside the shard lock.
+    """
+    store = get_metadata_store()
+    prefix = shard_prefix(data_type, shard)
+    current = store.get_ann(data_type, shard)
+    name = prefix.rstrip("_")
+
+    with file_lock(shard_lock_path(data_type, shard)):
+        rows = store.rows_by_index(prefix)  # live rows; files they point at outlive the gc grace
+
+    if len(rows) < min_vectors:
+        if current is not None:
+            store.drop_ann(data_type, shard)
+            return {"shard": name, "action": "dropped", "vectors": len(rows)}
+        return {"shard": name, "action": "exact", "vectors": len(rows)}
+
+    if current is not None and not force and current["kind"] == kind:
+        new_rows = store.count_by_index(prefix, after_id=current["max_row_id"])
+        if new_rows <= ANN_RETRAIN_GROWTH * current["n_vectors"]:
+            return {"shard": name, "action": "kept", "vectors": len(rows), "new": new_rows}
+
+    ids = np.array([row["id"] for row in rows], dtype=np.int64)
+    index = build_index(kind, _read_vectors(rows), ids)
+    index_name = f"ann_{data_type.lower()}_{shard:03d}_{int(time.time() * 1000)}.index"
+    _atomic_write_index(index, os.path.join(INDICES_DIR, index_name))
+    store.set_ann(data_type, shard, index_name, kind, int(ids.max()), len(ids))
+    return {"shard": name, "action": "built", "kind": kind, "vectors": len(ids)}
+
+
+def ann_due(data_type: str, shard: int, min_vectors: int = ANN_MIN_VECTORS) -> bool:
+    """Cheap check (row counts only): would build_ann promote or retrain the shard?"""
+    store = get_metadata_store()
+    prefix = shard_prefix(data_type, shard)
+    current = store.get_ann(data_type, shard)
+    if current is None:
+        return store.count_by_index(prefix) >= min_vectors
+    new_rows = store.count_by_index(prefix, after_id=current["max_row_id"])
+    return new_rows > ANN_RETRAIN_GROWTH * current["n_vectors"]
+
+
+def _build_ann_background(data_type: str, shard: int) -> None:
+    try:
+        print(f"ANN maintenance: {build_ann(data_type, shard)}")
+    except Exception as e:
+        print(f"ANN maintenance failed for {data_type} shard {shard}: {e}")
+    finally:
+        with _ann_lock:
+            _ann_building.discard((data_type, shard))
+
+
+def schedule_ann(data_type: str, shard: int) -> bool:
+    """
+    Called after an ingest into the shard: when it has grown past
+    ANN_MIN_VECTORS (or enough to retrain), run build_ann in a background
+    thread so the writer does not wait for training. Checked at most
+    every ANN_CHECK_INTERVAL_S per shard. Returns whether a build started.
+    """
+    key = (data_type, shard)
+    now = time.monotonic()
+    with _ann_lock:
+        if key in _ann_building or now - _ann_checked.get(key, float("-inf")) < ANN_CHECK_INTERVAL_S:
+            return False
+        _ann_checked[key] = now
+
+    if not ann_due(data_type, shard):
+        return False
+    with _ann_lock:
+        if key in _ann_building:
+            return False
+        _ann_building.add(key)
+    threading.Thread(
+        target=_build_ann_background, args=key, name=f"ann-{data_type.lower()}-{shard:03d}", daemon=True
+    ).start()
+    return True
+
+
+def maintain_ann(kind: str = ANN_KIND, force: bool = False) -> list:
+    """build_ann for every shard; cheap when nothing changed."""
+    return [
+        build_ann(data_type, shard, kind=kind, force=force)
+        for data_type in ("CV", "JD")
+        for shard in range(SHARD_COUNT)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("consolidate", help="move per-job index files into shards")
+    p_compact = sub.add_parser("compact", help="rewrite shards with many dead vectors")
+    p_compact.add_argument("--min-dead", type=float, default=0.2, help="dead-vector ratio that triggers a rewrite")
+    p_gc = sub.add_parser("gc", help="drop placeholder companies and unreferenced files")
+    p_gc.add_argument("--temp-prefix", default="temp-company-", help="placeholder company id prefix ('' to skip)")
+    p_gc.add_argument("--temp-ttl-hours", type=float, default=24)
+    p_gc.add_argument("--grace-minutes", type=float, default=GC_GRACE_S / 60)
+    p_ann = sub.add_parser("ann", help="promote large shards to ANN search indices, retrain grown ones")
+    p_ann.add_argument("--kind", default=ANN_KIND, help="flat | hnsw | ivf_flat | ivf_pq")
+    p_ann.add_argument("--force", action="store_true", help="rebuild every promoted shard")
+    args = parser.parse_args()
+
+    if args.command == "consolidate":
+        print(consolidate())
+    elif args.command == "compact":
+        print(compact(args.min_dead))
+    elif args.command == "ann":
+        for result in maintain_ann(args.kind, args.force):
+            print(result)
+    else:
+        print(gc(args.temp_prefix, args.temp_ttl_hours * 3600, args.grace_minutes * 60))
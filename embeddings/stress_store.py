@@ -0,0 +1,114 @@
+# stress check for concurrent vector store writers
+#
+#   python -m embeddings.stress_store [--processes 4] [--threads 4] [--cvs 25] [--segment-max 200]
+#
+# Runs in a throw-away store under a temp dir; random vectors stand in for
+# the model so no download is needed. A small segment size makes writers
+# roll over to new shard segments while racing.
+import os
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+DIM = 384
+# string ids, as ml_service passes them (Mongo ObjectIds)
+COMPANY_ID, JOB_ID = "65f1c2ab9e8d4b0012a3c4d5", "65f1c2ab9e8d4b0012a3c4d6"
+
+
+def _vectors(candidate_id: str, n_chunks: int) -> np.ndarray:
+    seed = int.from_bytes(candidate_id.encode(), "little") % (2 ** 32)
+    return np.random.default_rng(seed).standard_normal((n_chunks, DIM)).astype(np.float32)
+
+
+def _ingest(candidate_ids):
+    from embeddings.embeddings import make_metadata, store_embeddings
+
+    for candidate_id in candidate_ids:
+        n_chunks = 1 + len(candidate_id) % 4
+        metadata = [
+            make_metadata(COMPANY_ID, JOB_ID, "CV", f"chunk {i}", chunk_id=i, candidate_id=candidate_id)
+            for i in range(n_chunks)
+        ]
+        store_embeddings(_vectors(candidate_id, n_chunks), metadata)
+
+
+def _worker(args):
+    process_no, threads, cvs = args
+    batches = [
+        [f"p{process_no}-t{t}-cv{i}" for i in range(cvs)]
+        for t in range(threads)
+    ]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(_ingest, batches))
+    return [cid for batch in batches for cid in batch]
+
+
+def run(processes: int, threads: int, cvs: int, mp_context=None) -> dict:
+    """
+    Ingest from processes x threads writers at once, then verify the store
+    (under the working directory). mp_context as for ProcessPoolExecutor;
+    "spawn" workers start clean when this process already loaded faiss.
+    """
+    import faiss
+    from embeddings.embeddings import INDICES_DIR, get_metadata_store, l2_normalize_rows, shard_of, shard_segments
+    from embeddings.store_maintenance import _read_vectors
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=mp_context) as pool:
+        jobs = [(p, threads, cvs) for p in range(processes)]
+        candidate_ids = [cid for ids in pool.map(_worker, jobs) for cid in ids]
+
+    segments = shard_segments("CV", shard_of(COMPANY_ID))
+    stored = sum(faiss.read_index(os.path.join(INDICES_DIR, name)).ntotal for name in segments)
+    rows = get_metadata_store().rows(COMPANY_ID, JOB_ID, "CV")
+    expected = sum(1 + len(cid) % 4 for cid in candidate_ids)
+
+    problems = []
+    if stored != expected:
+        problems.append(f"shard has {stored} vectors, expected {expected}")
+    if len(rows) != expected:
+        problems.append(f"metadata has {len(rows)} rows, expected {expected}")
+    if len({(row["index_name"], row["vector_id"]) for row in rows}) != len(rows):
+        problems.append("several metadata rows point at the same vector")
+
+    # every metadata row must point at the vector that was stored with it
+    by_candidate = {}
+    for row in rows:
+        by_candidate.setdefault(row["candidate_id"], []).append(row)
+    for candidate_id in candidate_ids:
+        cand_rows = sorted(by_candidate.get(candidate_id, []), key=lambda r: r["chunk_id"])
+        want = l2_normalize_rows(_vectors(candidate_id, 1 + len(candidate_id) % 4))
+        if len(cand_rows) != len(want):
+            problems.append(f"{candidate_id}: {len(cand_rows)} rows, expected {len(want)}")
+            continue
+        got = _read_vectors(cand_rows)
+        if not np.allclose(got, want, atol=1e-6):
+            problems.append(f"{candidate_id}: stored vectors do not match metadata")
+
+    return {
+        "writers": processes * threads,
+        "cvs": len(candidate_ids),
+        "vectors": int(stored),
+        "segments": len(segments),
+        "problems": problems,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent ingest stress check")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--cvs", type=int, default=25, help="CVs per writer thread")
+    parser.add_argument("--segment-max", type=int, default=200, help="vectors per shard segment")
+    args = parser.parse_args()
+    os.environ["VECTOR_SEGMENT_MAX"] = str(args.segment_max)  # read when embeddings is imported
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # STORE_ROOT is relative to the working directory
+        result = run(args.processes, args.threads, args.cvs)
+
+    print(result)
+    if result["problems"]:
+        raise SystemExit(1)
+    print("OK: no vectors lost, index and metadata agree")
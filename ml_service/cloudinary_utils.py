@@ -1,5 +1,6 @@
 import cloudinary
 import cloudinary.uploader
+import io
 import os
 from dotenv import load_dotenv
 
@@ -11,12 +12,18 @@ cloudinary.config(
     api_secret=os.getenv("CLOUDINARY_API_SECRET")
 )
 
-def upload_cv(file_path:str)->str:
-  if not os.path.exists(file_path):
-        raise RuntimeError(f"CV file does not exist: {file_path}")
+def upload_cv(cv, filename:str=None)->str:
+  """Upload a CV file path, or the PDF bytes (streamed from memory)."""
+  if isinstance(cv, str):
+    if not os.path.exists(cv):
+        raise RuntimeError(f"CV file does not exist: {cv}")
+    file = cv
+  else:
+    file = io.BytesIO(cv)
+    file.name = os.path.basename(filename or "cv.pdf")
   try:
     res=cloudinary.uploader.upload(
-        file_path,
+        file,
         resource_type="raw",
         folder="cvs",
         access_mode="public"
@@ -0,0 +1,83 @@
+import os
+import uuid
+from typing import Union
+
+from text_extract_and_code_clean.pdf_pages import MAX_BYTES
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Uploads up to this size stay in memory; bigger ones spill to a file
+SPILL_BYTES = int(float(os.getenv("CV_SPILL_MB", "8")) * 1024 * 1024)
+SPILL_DIR = os.getenv("CV_SPILL_DIR", os.path.join(BASE_DIR, "temp_cvs"))
+
+# What the pipeline evaluates: the PDF bytes, or the path of a spilled file
+CVSource = Union[bytes, str]
+
+
+class CVTooLarge(ValueError):
+    """The upload is over the PDF size limit (CV_PDF_MAX_MB)."""
+
+
+def read_cv_upload(upload, spill_bytes: int = SPILL_BYTES, max_bytes: int = MAX_BYTES) -> CVSource:
+    """
+    Read an uploaded CV once.
+
+    Returns the bytes when the upload fits in spill_bytes. Otherwise it is
+    streamed into a uniquely named file under SPILL_DIR and the path is
+    returned (remove it with discard_cv). Uploads over max_bytes raise
+    CVTooLarge before the rest is read.
+    """
+    head = upload.file.read(spill_bytes + 1)
+    if len(head) > max_bytes:
+        raise CVTooLarge(f"CV is over the {max_bytes} byte limit")
+    if len(head) <= spill_bytes:
+        return head
+
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    name = os.path.basename(upload.filename or "cv.pdf")
+    path = os.path.join(SPILL_DIR, f"{uuid.uuid4()}_{name}")
+    try:
+        with open(path, "wb") as f:
+            f.write(head)
+            del head
+            written = f.tell()
+            while True:
+                chunk = upload.file.read(1024 * 1024)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise CVTooLarge(f"CV is over the {max_bytes} byte limit")
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def discard_cv(cv: CVSource) -> None:
+    """Remove a spilled CV file; in-memory CVs need nothing."""
+    if isinstance(cv, str) and os.path.exists(cv):
+        os.remove(cv)
+
+
+def save_upload(upload, path: str, max_bytes: int = MAX_BYTES) -> None:
+    """
+    Stream an upload to path (durable spools such as the job queue).
+    Uploads over max_bytes raise CVTooLarge and leave no file behind.
+    """
+    try:
+        with open(path, "wb") as f:
+            written = 0
+            while True:
+                chunk = upload.file.read(1024 * 1024)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise CVTooLarge(f"CV is over the {max_bytes} byte limit")
+                f.write(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
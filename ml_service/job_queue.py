@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import sqlite3
+
+from .pipeline import evaluate_async
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Queue settings
+JOBS_DB = os.getenv("ML_JOBS_DB", os.path.join(BASE_DIR, "jobs.db"))
+SPOOL_DIR = os.getenv("ML_JOBS_SPOOL", os.path.join(BASE_DIR, "job_spool"))
+JOB_WORKERS = int(os.getenv("ML_JOB_WORKERS", "4"))
+MAX_QUEUED = int(os.getenv("ML_JOB_QUEUE_SIZE", "100"))
+# A claimed job belongs to its worker process for this long; the worker
+# renews it while the job runs, so only jobs of dead processes expire
+JOB_LEASE_S = float(os.getenv("ML_JOB_LEASE_S", "120"))
+# Finished jobs (and leftover spool files) are deleted after this long
+JOB_RETENTION_S = float(os.getenv("ML_JOB_RETENTION_S", str(7 * 24 * 3600)))
+JOB_PRUNE_INTERVAL_S = float(os.getenv("ML_JOB_PRUNE_INTERVAL_S", "3600"))
+
+
+class QueueFull(Exception):
+    """Raised by submit() when MAX_QUEUED jobs are already waiting."""
+
+
+class JobStore:
+    """
+    SQLite table of evaluation jobs.
+    Status goes queued -> running -> done / failed. A running job carries
+    its owner (the worker process) and the time its lease runs out.
+    """
+
+    def __init__(self, path: str = JOBS_DB):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                       id TEXT PRIMARY KEY,
+                       status TEXT NOT NULL,
+                       payload TEXT NOT NULL,
+                       cv_path TEXT NOT NULL,
+                       result TEXT,
+                       error TEXT,
+                       created_at REAL NOT NULL,
+                       updated_at REAL NOT NULL,
+                       owner TEXT,
+                       lease_until REAL
+                   )"""
+            )
+            # tables created before leases
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, job_id: str, payload: dict, cv_path: str, max_queued: int = None) -> None:
+        """
+        Insert a queued job. With max_queued, the queue length is checked
+        in the same write transaction, so concurrent submits cannot go
+        past the cap; raises QueueFull when it is reached.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if max_queued is not None:
+                queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= max_queued:
+                    raise QueueFull(f"{max_queued} evaluations already queued")
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, cv_path, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), cv_path, now, now),
+            )
+
+    def count_queued(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def claim_next(self, owner: str, lease_s: float = JOB_LEASE_S):
+        """
+        Atomically move the oldest queued job, or a running job whose
+        lease has run out, to running under owner and return it.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND (lease_until IS NULL OR lease_until < ?)) "
+                "ORDER BY created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                (owner, now + lease_s, now, row["id"]),
+            )
+            return dict(row)
+
+    def renew(self, job_id: str, owner: str, lease_s: float = JOB_LEASE_S) -> bool:
+        """Extend owner's lease on a running job; False once it is no longer theirs."""
+        now = time.time()
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (now + lease_s, now, job_id, owner),
+            ).rowcount == 1
+
+    def finish(self, job_id: str, owner: str, result: dict = None, error: str = None) -> bool:
+        """Record the outcome, unless the lease was lost to another worker meanwhile."""
+        status = "failed" if error is not None else "done"
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (status, None if result is None else json.dumps(result), error, time.time(), job_id, owner),
+            ).rowcount == 1
+
+    def release(self, owner: str) -> int:
+        """owner's running jobs go back to the queue (clean shutdown)."""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE status = 'running' AND owner = ?",
+                (time.time(), owner),
+            ).rowcount
+
+    def requeue_expired(self) -> int:
+        """Running jobs whose lease ran out (their process died) go back to the queue."""
+        now = time.time()
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+                (now, now),
+            ).rowcount
+
+    def prune(self, older_than: float) -> list:
+        """Delete done / failed jobs last updated before older_than; returns their cv paths."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            paths = [
+                row["cv_path"] for row in conn.execute(
+                    "SELECT cv_path FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                    (older_than,),
+                )
+            ]
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (older_than,)
+            )
+        return paths
+
+    def active_ids(self) -> set:
+        """Ids of queued and running jobs (their spool files are in use)."""
+        with self._connect() as conn:
+            return {row["id"] for row in conn.execute("SELECT id FROM jobs WHERE status IN ('queued', 'running')")}
+
+    def get(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class JobQueue:
+    """
+    Bounded pool of asyncio workers that run evaluate_async for queued jobs.
+    Jobs are claimed from the JobStore under a lease that the worker renews
+    while the job runs. Several processes can share one store: a job is
+    only taken over once its owner stopped renewing it, and anything still
+    queued when a process stops is picked up by the others or on restart.
+    """
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, max_queued: int = MAX_QUEUED,
+                 lease_s: float = JOB_LEASE_S):
+        self.store = store
+        self.workers = workers
+        self.max_queued = max_queued
+        self.lease_s = lease_s
+        # unique per process start: a restarted process never owns old leases
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    async def start(self):
+        os.makedirs(SPOOL_DIR, exist_ok=True)
+        requeued = await asyncio.to_thread(self.store.requeue_expired)
+        if requeued:
+            print(f"♻️ Re-queued {requeued} interrupted evaluation job(s)")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._janitor()))
+        self._wakeup.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # hand unfinished jobs back now instead of when their leases run out
+        await asyncio.to_thread(self.store.release, self.owner)
+
+    def spool_path(self, job_id: str, filename: str) -> str:
+        return os.path.join(SPOOL_DIR, f"{job_id}_{os.path.basename(filename or 'cv.pdf')}")
+
+    async def submit(self, payload: dict, cv_path: str, job_id: str) -> str:
+        """Queue an evaluation whose CV is already spooled at cv_path."""
+        await asyncio.to_thread(self.store.create, job_id, payload, cv_path, max_queued=self.max_queued)
+        self._wakeup.set()
+        return job_id
+
+    @staticmethod
+    def new_job_id() -> str:
+        return str(uuid.uuid4())
+
+    async def _worker(self):
+        while True:
+            # cleared before claiming: a submit during the claim sets it again
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self.store.claim_next, self.owner, self.lease_s)
+            if job is None:
+                try:
+                    # woken by a submit, or after one lease to take over expired jobs
+                    await asyncio.wait_for(self._wakeup.wait(), self.lease_s)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+            try:
+                result = await evaluate_async(cv=job["cv_path"], **json.loads(job["payload"]))
+                finished = await asyncio.to_thread(self.store.finish, job["id"], self.owner, result=result)
+            except asyncio.CancelledError:
+                raise  # released on stop; taken over once the lease runs out otherwise
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                finished = await asyncio.to_thread(self.store.finish, job["id"], self.owner, error=str(e))
+            finally:
+                heartbeat.cancel()
+
+            # a job taken over by another worker still needs its CV
+            if finished and os.path.exists(job["cv_path"]):
+                os.remove(job["cv_path"])
+
+    async def _heartbeat(self, job_id: str):
+        """Renew the lease of a running job until it finishes."""
+        while True:
+            await asyncio.sleep(self.lease_s / 3)
+            if not await asyncio.to_thread(self.store.renew, job_id, self.owner, self.lease_s):
+                print(f"⚠️ Lost the lease on evaluation job {job_id}")
+                return
+
+    async def _janitor(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.prune)
+            except Exception as e:
+                print("⚠️ Job pruning failed:", e)
+            await asyncio.sleep(JOB_PRUNE_INTERVAL_S)
+
+    def prune(self, retention_s: float = JOB_RETENTION_S) -> int:
+        """
+        Delete jobs finished more than retention_s ago, their spool files,
+        and spool files that no queued or running job refers to (uploads
+        whose submit failed, crashes between finish and cleanup).
+        """
+        cutoff = time.time() - retention_s
+        paths = self.store.prune(cutoff)
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+        active = self.store.active_ids()
+        for name in os.listdir(SPOOL_DIR) if os.path.isdir(SPOOL_DIR) else []:
+            path = os.path.join(SPOOL_DIR, name)
+            if name.split("_", 1)[0] not in active and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        return len(paths)
@@ -1,12 +1,44 @@
 import os
-import shutil
-import uuid
+import json
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import List
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from ml_service.pipeline import evaluate
+from fastapi.responses import StreamingResponse
+from ml_service.pipeline import evaluate_async, evaluate_batch_async, get_process_pool, shutdown_pools
+from ml_service.job_queue import JobQueue, JobStore, QueueFull
+from ml_service.cv_input import CVTooLarge, discard_cv, read_cv_upload, save_upload
+from ml_service.uploader import background_uploader
+from embeddings.embeddings import warmup
 
-app = FastAPI(title="CV-ALIGN-ML SERVICE MODULE")
+# Load the embedding model at startup instead of on the first request
+EMBED_WARMUP = os.getenv("EMBED_WARMUP", "1") == "1"
+
+startup_timings = {}
+
+job_queue = JobQueue(JobStore())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    if EMBED_WARMUP:
+        startup_timings["embedding_warmup_s"] = round(warmup(), 3)
+    startup_timings["startup_s"] = round(time.perf_counter() - start, 3)
+    print("🚀 ML service startup timings:", startup_timings)
+    get_process_pool()  # created here, not by the first requests' threads
+    background_uploader.start()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    background_uploader.stop()
+    shutdown_pools()
+
+
+app = FastAPI(title="CV-ALIGN-ML SERVICE MODULE", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +52,11 @@ app.add_middleware(
 )
 
 
+@app.get("/health")
+def health():
+    return {"status": "ok", "startup": startup_timings}
+
+
 @app.post("/api/evaluate-cv")
 async def evaluate_cv_api(
     request: Request,
@@ -34,26 +71,20 @@ async def evaluate_cv_api(
     form = await request.form()
     print("🔥 FASTAPI RECEIVED FORM KEYS:", list(form.keys()))
 
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    temp_dir = os.path.join(BASE_DIR, "temp_cvs")
-    os.makedirs(temp_dir, exist_ok=True)
-
-    temp_path = os.path.join(
-        temp_dir, f"{uuid.uuid4()}_{cv.filename}"
-    )
-
+    # one read of the upload; kept in memory unless it is very large
     try:
-        with open(temp_path, "wb") as f:
-            shutil.copyfileobj(cv.file, f)
+        cv_data = await asyncio.to_thread(read_cv_upload, cv)
+    except CVTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-        print("📄 CV saved at:", temp_path)
-
-        result = evaluate(
+    try:
+        result = await evaluate_async(
             company_id=company_id,
             job_id=job_id,
             job_title=job_title,
             jd_text=jd_text,
-            cv_file_path=temp_path,
+            cv=cv_data,
+            cv_filename=cv.filename,
         )
 
         return result
@@ -64,5 +95,94 @@ async def evaluate_cv_api(
         raise HTTPException(status_code=500, detail=str(e))
 
     finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        discard_cv(cv_data)
+
+
+@app.post("/api/evaluate-cvs")
+async def evaluate_cvs_api(
+    job_id: str = Form(...),
+    company_id: str = Form(...),
+    jd_text: str = Form(...),
+    job_title: str = Form(""),
+    cvs: List[UploadFile] = File(...),
+):
+    """
+    Evaluate N CVs against one JD. Results stream back as NDJSON,
+    one line per CV, in the order they finish.
+    """
+    cv_files = []
+    try:
+        for cv in cvs:
+            cv_files.append((cv.filename, await asyncio.to_thread(read_cv_upload, cv)))
+    except CVTooLarge as e:
+        for _, cv_data in cv_files:
+            discard_cv(cv_data)
+        raise HTTPException(status_code=413, detail=f"{cv.filename}: {e}")
+
+    async def stream():
+        try:
+            async for result in evaluate_batch_async(
+                company_id=company_id,
+                job_id=job_id,
+                job_title=job_title,
+                jd_text=jd_text,
+                cv_files=cv_files,
+            ):
+                yield json.dumps(result) + "\n"
+        finally:
+            for _, cv_data in cv_files:
+                discard_cv(cv_data)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# =========================
+# Job-queue mode: submit now, poll for the result
+# =========================
+@app.post("/api/jobs/evaluate-cv", status_code=202)
+async def submit_evaluate_cv_job(
+    job_id: str = Form(...),
+    company_id: str = Form(...),
+    jd_text: str = Form(...),
+    job_title: str = Form(""),
+    email: str = Form(""),
+    cv: UploadFile = File(...),
+):
+    eval_job_id = job_queue.new_job_id()
+    spool_path = job_queue.spool_path(eval_job_id, cv.filename)
+    try:
+        await asyncio.to_thread(save_upload, cv, spool_path)
+    except CVTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    try:
+        await job_queue.submit(
+            {
+                "company_id": company_id,
+                "job_id": job_id,
+                "job_title": job_title,
+                "jd_text": jd_text,
+            },
+            spool_path,
+            eval_job_id,
+        )
+    except QueueFull as e:
+        os.remove(spool_path)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+    return {"job_id": eval_job_id, "status": "queued"}
+
+
+@app.get("/api/jobs/{eval_job_id}")
+def get_evaluate_cv_job(eval_job_id: str):
+    job = job_queue.store.get(eval_job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
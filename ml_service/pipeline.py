@@ -1,76 +1,63 @@
-from text_extract_and_code_clean.code import extract_and_clean_from_file
-from embeddings.embeddings import process_cv_application, process_jd_creation
-from Feedback.feedback_generator import generate_feedback
+from text_extract_and_code_clean.code import extract_pdf, structure_cv_text
+from embeddings.embeddings import process_cv_application, process_cv_applications, process_jd_creation
+from Feedback.feedback_generator import submit_feedback
 from .one_line import normalize_text_one_line
+import os
 import uuid
-import requests
-from .cloudinary_utils import upload_cv
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from .uploader import background_uploader
+from .scoring_client import get_scoring_client
 from datetime import date   # ✅ NEW
 
-# RAG scoring service URL
-RAG_SCORE_API = "http://localhost:8002/score"
+# Processes for CPU-heavy stages (pdfminer text extraction)
+CPU_WORKERS = int(os.getenv("ML_CPU_WORKERS", str(os.cpu_count() or 1)))
+# workers are spawned, not forked: by the time the pool starts, torch and
+# the service's threads are running, and a forked child can inherit locks
+# held by those threads and deadlock
+CPU_POOL_START = os.getenv("ML_CPU_POOL_START", "spawn")
+_process_pool = None
 
 
-def get_rag_score(company_id: str, job_id: str, candidate_id: str) -> float:
-    payload = {
-        "company_id": company_id,
-        "job_id": job_id,
-        "candidate_id": candidate_id
-    }
-
-    res1 = requests.post(RAG_SCORE_API, json=payload, timeout=15)
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context(CPU_POOL_START)
+        )
+    return _process_pool
 
-    if res1.status_code != 200:
-        raise RuntimeError(f"RAG scoring failed: {res1.text}")
 
-    return res1.json()["score"]
+def shutdown_pools():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
 
 
-def evaluate(
-    company_id: str,
-    job_id: str,
-    job_title: str,
-    jd_text: str,
-    cv_file_path: str
-) -> dict:
-    # upload cv
-    cv_url = upload_cv(cv_file_path)
-
-    # extract cv
-    cv_data = extract_and_clean_from_file(cv_file_path)
-    raw_cv_text = cv_data.get("raw_text", "")
-    cv_text = normalize_text_one_line(raw_cv_text)
+def get_rag_score(company_id: str, job_id: str, candidate_id: str) -> float:
+    """RAG score via the configured scoring client (RAG_SCORE_MODE)."""
+    return get_scoring_client().score(company_id, job_id, candidate_id)
 
-    # store jd embeddings
-    process_jd_creation({
-        "company_id": company_id,
-        "job_id": job_id,
-        "text": jd_text
-    })
 
-    # store cv embeddings
-    process_cv_application({
-        "company_id": company_id,
-        "job_id": job_id,
-        "text": cv_text
-    })
+def get_rag_scores(company_id: str, job_id: str, candidate_ids: list) -> dict:
+    """Scores for many candidates of one job in a single RAG call."""
+    return get_scoring_client().score_many(company_id, job_id, candidate_ids)
 
-    # candidate_id as STRING
-    candidate_id = str(uuid.uuid4())
 
-    score = get_rag_score(
-        company_id=company_id,
-        job_id=job_id,
-        candidate_id=candidate_id
-    )
+def archive_cv(cv, filename: str = None) -> None:
+    """
+    Hand the CV (bytes or path) to the background uploader (retries, spool).
+    Archival never slows down or fails the evaluation.
+    """
+    try:
+        background_uploader.enqueue(cv, filename)
+    except Exception as e:
+        print("⚠️ Could not spool CV for upload:", e)
 
-    # feedback
-    feedback_result = generate_feedback(
-        jd_text=jd_text,
-        cv_text=cv_text,
-        score=score
-    )
 
+def build_result(cv_data: dict, score: float, feedback_result: dict, job_title: str) -> dict:
     status = "pending" if score >= 70 else "pending"
 
     return {
@@ -90,3 +77,187 @@ def evaluate(
         "feedback": feedback_result.get("role_fit_explanation", ""),
         "jobTitle": job_title,
     }
+
+
+async def evaluate_async(
+    company_id: str,
+    job_id: str,
+    job_title: str,
+    jd_text: str,
+    cv,
+    cv_filename: str = None
+) -> dict:
+    """
+    Non-blocking evaluate for the FastAPI event loop.
+    cv is the PDF bytes (read once by the caller) or a file path; the
+    same buffer feeds extraction and the archive upload.
+
+    - blocking I/O (Groq, embedding, RAG call, Ollama) runs in threads
+    - pdfminer extraction runs in the process pool (long PDFs page-parallel)
+    - JD embedding and the CV extract -> embed chain run concurrently
+    - the Cloudinary upload is handed to the background uploader
+    """
+    # candidate_id as STRING
+    candidate_id = str(uuid.uuid4())
+
+    async def cv_chain():
+        # extract cv
+        pdf_text = await asyncio.to_thread(extract_pdf, cv, get_process_pool())
+        cv_data = await asyncio.to_thread(structure_cv_text, pdf_text)
+        cv_text = normalize_text_one_line(cv_data.get("raw_text", ""))
+
+        # store cv embeddings, tagged with the candidate they belong to
+        await asyncio.to_thread(process_cv_application, {
+            "company_id": company_id,
+            "job_id": job_id,
+            "candidate_id": candidate_id,
+            "text": cv_text
+        })
+        return cv_data, cv_text
+
+    _, _, (cv_data, cv_text) = await asyncio.gather(
+        # archive cv (spooled; uploaded in the background)
+        asyncio.to_thread(archive_cv, cv, cv_filename),
+        # store jd embeddings (no-op when the JD text is unchanged)
+        asyncio.to_thread(process_jd_creation, {
+            "company_id": company_id,
+            "job_id": job_id,
+            "text": jd_text
+        }),
+        cv_chain(),
+    )
+
+    score = await asyncio.to_thread(
+        get_rag_score,
+        company_id=company_id,
+        job_id=job_id,
+        candidate_id=candidate_id
+    )
+
+    # feedback
+    # queued on the feedback pool: waiting requests hold no shared thread
+    feedback_result = await asyncio.wrap_future(submit_feedback(
+        jd_text=jd_text,
+        cv_text=cv_text,
+        score=score
+    ))
+
+    return build_result(cv_data, score, feedback_result, job_title)
+
+
+async def evaluate_batch_async(
+    company_id: str,
+    job_id: str,
+    job_title: str,
+    jd_text: str,
+    cv_files: list
+):
+    """
+    Evaluate many CVs against one JD; async generator that yields one
+    result per CV as soon as it is ready.
+
+    cv_files is a list of (filename, PDF bytes or path). The JD is handled once, CVs are
+    extracted in parallel (and spooled for background upload), all chunks
+    are embedded in one batched call and every candidate is scored in one
+    RAG round trip. A CV that fails is reported as {"filename", "error"}
+    without stopping the batch; if the JD fails, every remaining CV is.
+    """
+    async def extract(filename, cv):
+        _, pdf_text = await asyncio.gather(
+            asyncio.to_thread(archive_cv, cv, filename),
+            asyncio.to_thread(extract_pdf, cv, get_process_pool()),
+        )
+        return await asyncio.to_thread(structure_cv_text, pdf_text)
+
+    # store jd embeddings once for the whole batch
+    jd_task = asyncio.create_task(asyncio.to_thread(process_jd_creation, {
+        "company_id": company_id,
+        "job_id": job_id,
+        "text": jd_text
+    }))
+    extracted = await asyncio.gather(
+        *(extract(filename, cv) for filename, cv in cv_files), return_exceptions=True
+    )
+
+    candidates = []
+    for (filename, _), cv_data in zip(cv_files, extracted):
+        if isinstance(cv_data, Exception):
+            yield {"filename": filename, "error": str(cv_data)}
+            continue
+        cv_text = normalize_text_one_line(cv_data.get("raw_text", ""))
+        if not cv_text:
+            yield {"filename": filename, "error": "No text extracted from CV"}
+            continue
+        candidates.append({
+            "filename": filename,
+            "candidate_id": str(uuid.uuid4()),
+            "cv_data": cv_data,
+            "cv_text": cv_text,
+        })
+
+    try:
+        await jd_task
+    except Exception as e:
+        # without the JD nothing can be scored: every CV gets the error
+        for c in candidates:
+            yield {"filename": c["filename"], "error": str(e)}
+        return
+    if not candidates:
+        return
+
+    try:
+        # one batched embedding call for every chunk of every CV
+        await asyncio.to_thread(process_cv_applications, [
+            {
+                "company_id": company_id,
+                "job_id": job_id,
+                "candidate_id": c["candidate_id"],
+                "text": c["cv_text"],
+            }
+            for c in candidates
+        ])
+
+        scores = await asyncio.to_thread(
+            get_rag_scores,
+            company_id=company_id,
+            job_id=job_id,
+            candidate_ids=[c["candidate_id"] for c in candidates]
+        )
+    except Exception as e:
+        for c in candidates:
+            yield {"filename": c["filename"], "error": str(e)}
+        return
+
+    async def finish(c):
+        score = scores[c["candidate_id"]]
+        try:
+            feedback_result = await asyncio.wrap_future(submit_feedback(
+                jd_text=jd_text,
+                cv_text=c["cv_text"],
+                score=score
+            ))
+        except Exception as e:
+            return {"filename": c["filename"], "error": str(e)}
+        return {"filename": c["filename"], **build_result(c["cv_data"], score, feedback_result, job_title)}
+
+    for next_done in asyncio.as_completed([finish(c) for c in candidates]):
+        yield await next_done
+
+
+def evaluate(
+    company_id: str,
+    job_id: str,
+    job_title: str,
+    jd_text: str,
+    cv,
+    cv_filename: str = None
+) -> dict:
+    """Synchronous entry point for scripts; runs evaluate_async to completion."""
+    return asyncio.run(evaluate_async(
+        company_id=company_id,
+        job_id=job_id,
+        job_title=job_title,
+        jd_text=jd_text,
+        cv=cv,
+        cv_filename=cv_filename,
+    ))
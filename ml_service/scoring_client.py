@@ -0,0 +1,108 @@
+import os
+import sys
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "http"  -> call the RAG service over a pooled keep-alive session
+# "local" -> import rag/score and score in-process (co-located services)
+RAG_SCORE_MODE = os.getenv("RAG_SCORE_MODE", "http")
+RAG_SCORE_URL = os.getenv("RAG_SCORE_URL", "http://localhost:8002")
+RAG_HTTP_POOL_SIZE = int(os.getenv("RAG_HTTP_POOL_SIZE", "20"))
+
+
+class HttpScoringClient:
+    """RAG service client that reuses connections across requests."""
+
+    def __init__(self, base_url: str = RAG_SCORE_URL, pool_size: int = RAG_HTTP_POOL_SIZE, timeout: float = 15):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            # scoring is an idempotent upsert, so POST is safe to retry
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.2,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset({"POST"}),
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, path: str, payload: dict, timeout: float) -> dict:
+        res = self.session.post(f"{self.base_url}{path}", json=payload, timeout=timeout)
+        if res.status_code != 200:
+            raise RuntimeError(f"RAG scoring failed: {res.text}")
+        return res.json()
+
+    def score(self, company_id: str, job_id: str, candidate_id: str) -> float:
+        payload = {
+            "company_id": company_id,
+            "job_id": job_id,
+            "candidate_id": candidate_id
+        }
+        return self._post("/score", payload, self.timeout)["score"]
+
+    def score_many(self, company_id: str, job_id: str, candidate_ids: list) -> dict:
+        payload = {
+            "company_id": company_id,
+            "job_id": job_id,
+            "candidate_ids": candidate_ids
+        }
+        data = self._post("/score/batch", payload, self.timeout * 2)
+        return {item["candidate_id"]: item["score"] for item in data["scores"]}
+
+
+class LocalScoringClient:
+    """
+    Scores in-process with the RAG service's own rag/score modules, which
+    read the shared vector_store directly. No network hop or JSON round
+    trip; scores are not written to the RAG service's applications.db.
+    """
+
+    def __init__(self):
+        rag_dir = os.path.join(BASE_DIR, "RAG and Scoring")
+        if rag_dir not in sys.path:
+            sys.path.append(rag_dir)
+        import rag  # noqa: E402  (lives in "RAG and Scoring", not a package)
+
+        self._rag = rag
+
+    def _scores(self, company_id: str, job_id: str, candidate_ids: list) -> list:
+        try:
+            return self._rag.score_candidates(company_id, job_id, candidate_ids, k=10)
+        except FileNotFoundError as e:
+            raise RuntimeError(f"RAG scoring failed: {e}")
+
+    def score(self, company_id: str, job_id: str, candidate_id: str) -> float:
+        return float(self._scores(company_id, job_id, [candidate_id])[0])
+
+    def score_many(self, company_id: str, job_id: str, candidate_ids: list) -> dict:
+        scores = self._scores(company_id, job_id, candidate_ids)
+        return {cid: float(score) for cid, score in zip(candidate_ids, scores)}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_scoring_client():
+    """Shared scoring client for RAG_SCORE_MODE (created on first use)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if RAG_SCORE_MODE == "local":
+                    _client = LocalScoringClient()
+                elif RAG_SCORE_MODE == "http":
+                    _client = HttpScoringClient()
+                else:
+                    raise ValueError(f"Unknown RAG_SCORE_MODE: {RAG_SCORE_MODE}")
+    return _client
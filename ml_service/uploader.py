@@ -0,0 +1,166 @@
+import os
+import queue
+import shutil
+import threading
+import uuid
+
+from .cloudinary_utils import upload_cv
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Archival upload settings
+SPOOL_DIR = os.getenv("CV_UPLOAD_SPOOL", os.path.join(BASE_DIR, "upload_spool"))
+MAX_ATTEMPTS = int(os.getenv("CV_UPLOAD_MAX_ATTEMPTS", "5"))
+BACKOFF_S = float(os.getenv("CV_UPLOAD_BACKOFF_S", "2"))
+# in-memory CVs waiting for upload; past this they are spooled right away
+MEMORY_BYTES = int(float(os.getenv("CV_UPLOAD_MEMORY_MB", "64")) * 1024 * 1024)
+
+
+class BackgroundUploader:
+    """
+    Archives CVs to Cloudinary off the evaluation's critical path.
+
+    enqueue() returns immediately; one daemon thread uploads queued CVs,
+    retrying with exponential backoff. CV files are linked into a local
+    spool directory. CV bytes are uploaded straight from memory and only
+    written to the spool when the first attempt fails, more than
+    memory_bytes are waiting, or the uploader stops. Files still in the
+    spool when the process stops are picked up again by start(). Files
+    that exhaust MAX_ATTEMPTS are moved to SPOOL_DIR/failed for inspection.
+    """
+
+    def __init__(self, spool_dir: str = SPOOL_DIR, upload_fn=upload_cv,
+                 max_attempts: int = MAX_ATTEMPTS, backoff_s: float = BACKOFF_S,
+                 memory_bytes: int = MEMORY_BYTES):
+        self.spool_dir = spool_dir
+        self.failed_dir = os.path.join(spool_dir, "failed")
+        self.upload_fn = upload_fn
+        self.max_attempts = max_attempts
+        self.backoff_s = backoff_s
+        self.memory_bytes = memory_bytes
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._memory = {}  # key -> (bytes, filename) of CVs not spooled
+        self._memory_used = 0
+        self.uploaded = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the upload thread and resume anything left in the spool."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            os.makedirs(self.failed_dir, exist_ok=True)
+            for name in sorted(os.listdir(self.spool_dir)):
+                path = os.path.join(self.spool_dir, name)
+                if os.path.isfile(path) and not name.endswith(".tmp"):
+                    self._queue.put((path, 1))
+            self._thread = threading.Thread(target=self._run, name="cv-uploader", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop after the current upload; unsent files stay spooled."""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            thread, self._thread = self._thread, None
+        thread.join(timeout=5)
+        # unsent in-memory CVs go to the spool for the next start()
+        with self._lock:
+            pending, self._memory, self._memory_used = self._memory, {}, 0
+        for data, filename in pending.values():
+            self._spool_bytes(data, filename)
+
+    def enqueue(self, cv, filename: str = None) -> str:
+        """
+        Queue a CV for upload: a file path (spooled) or the PDF bytes
+        (held in memory). Returns the spooled path, or None when in memory.
+        """
+        self.start()
+        if not isinstance(cv, str):
+            with self._lock:
+                in_memory = self._memory_used + len(cv) <= self.memory_bytes
+                if in_memory:
+                    key = f"memory:{uuid.uuid4()}"
+                    self._memory[key] = (bytes(cv), filename)
+                    self._memory_used += len(cv)
+            if in_memory:
+                self._queue.put((key, 1))
+                return None
+            spooled = self._spool_bytes(cv, filename)
+        else:
+            spooled = self._spool_path(filename or cv)
+            tmp = spooled + ".tmp"
+            try:
+                os.link(cv, tmp)  # same filesystem: no copy
+            except OSError:
+                shutil.copyfile(cv, tmp)
+            os.replace(tmp, spooled)
+        self._queue.put((spooled, 1))
+        return spooled
+
+    def _spool_path(self, filename: str) -> str:
+        return os.path.join(self.spool_dir, f"{uuid.uuid4()}_{os.path.basename(filename or 'cv.pdf')}")
+
+    def _spool_bytes(self, data, filename: str) -> str:
+        spooled = self._spool_path(filename)
+        tmp = spooled + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, spooled)
+        return spooled
+
+    def _take_memory(self, key: str):
+        with self._lock:
+            held = self._memory.pop(key, None)
+            if held is not None:
+                self._memory_used -= len(held[0])
+        return held
+
+    def _retry_later(self, path: str, attempt: int) -> None:
+        delay = self.backoff_s * (2 ** (attempt - 1))
+        timer = threading.Timer(delay, self._queue.put, args=((path, attempt + 1),))
+        timer.daemon = True
+        timer.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, attempt = item
+            with self._lock:
+                held = self._memory.get(path)
+            if held is None and not os.path.exists(path):
+                continue  # uploaded, or spooled by stop()
+
+            try:
+                if held is None:
+                    url = self.upload_fn(path)
+                else:
+                    url = self.upload_fn(held[0], held[1])
+                self.uploaded += 1
+                print(f"☁️ CV archived: {url}")
+                if held is None:
+                    os.remove(path)
+                else:
+                    self._take_memory(path)
+            except Exception as e:
+                if held is not None:
+                    # retries (and restarts) work from the spool
+                    held = self._take_memory(path)
+                    if held is None:
+                        continue
+                    path = self._spool_bytes(*held)
+                if attempt < self.max_attempts:
+                    print(f"⚠️ CV upload failed (attempt {attempt}/{self.max_attempts}), retrying: {e}")
+                    self._retry_later(path, attempt)
+                else:
+                    self.failed += 1
+                    print(f"❌ CV upload gave up after {attempt} attempts: {e}")
+                    os.replace(path, os.path.join(self.failed_dir, os.path.basename(path)))
+
+
+background_uploader = BackgroundUploader()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the services import the repo packages from the root, and score / rag as
+# top-level modules of "RAG and Scoring" (the folder name has spaces)
+for path in (ROOT, os.path.join(ROOT, "RAG and Scoring")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
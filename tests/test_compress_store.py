@@ -0,0 +1,74 @@
+import faiss
+import numpy as np
+import pytest
+
+from embeddings import compress_store, embeddings
+from embeddings.index_factory import storage_kind
+
+
+@pytest.mark.parametrize("kind", ["fp16", "sq8"])
+def test_compressed_storage_passes_the_accuracy_gate(kind):
+    (result,) = compress_store.check([kind], synthetic=True)
+
+    assert result["passed"]
+    assert result["max_score_delta"] <= compress_store.MAX_SCORE_DELTA
+    assert result["min_cosine"] >= compress_store.MIN_COSINE
+    assert result["top10_overlap"] >= 0.95
+    assert result["pairs"] > 0 and result["mean_score_delta"] < 0.05
+    assert result["vs_flat"] <= {"fp16": 0.5, "sq8": 0.25}[kind]
+
+
+def _flat_store(tmp_path, monkeypatch):
+    """A flat store under tmp_path: one job, its JD and 40 candidates of 3 chunks."""
+    monkeypatch.chdir(tmp_path)  # STORE_ROOT is relative to the working directory
+    monkeypatch.setattr(embeddings, "_metadata_store", None)
+    monkeypatch.setattr(embeddings, "STORAGE_KIND", "flat")
+    monkeypatch.setattr("embeddings.store_maintenance.ANN_AUTO", False)
+
+    vectors, groups = compress_store._synthetic_set(n_candidates=40, chunks=3, n_jds=1)
+    jd, _, labels = groups[0]
+    embeddings.store_embeddings(jd[None, :], [embeddings.make_metadata("c1", "j1", "JD", "jd")])
+    for candidate in range(40):
+        rows = np.flatnonzero(labels == candidate)
+        embeddings.store_embeddings(vectors[rows], [
+            embeddings.make_metadata("c1", "j1", "CV", "cv", chunk_id=i, candidate_id=f"cand{candidate}")
+            for i in range(len(rows))
+        ])
+    return vectors, labels
+
+
+def test_convert_refuses_files_past_the_gate(tmp_path, monkeypatch):
+    _flat_store(tmp_path, monkeypatch)
+    name = embeddings.shard_segments("CV", embeddings.shard_of("c1"))[0]
+    before = faiss.read_index(f"{embeddings.INDICES_DIR}/{name}").reconstruct_n(0, 120)
+
+    result = compress_store.convert("sq8", max_score_delta=0.0, min_cosine=1.0, names=[name])
+
+    assert result["converted"] == []
+    assert [(e["file"], e["reason"]) for e in result["skipped"]] == [(name, "accuracy gate")]
+    after = faiss.read_index(f"{embeddings.INDICES_DIR}/{name}")
+    assert storage_kind(after) == "flat" and np.array_equal(after.reconstruct_n(0, 120), before)
+
+
+@pytest.mark.parametrize("kind", ["fp16", "sq8"])
+def test_convert_rewrites_store_files_in_place(kind, tmp_path, monkeypatch):
+    vectors, labels = _flat_store(tmp_path, monkeypatch)
+
+    result = compress_store.convert(kind)
+
+    shard = embeddings.shard_of("c1")
+    files = set(embeddings.shard_segments("CV", shard)) | set(embeddings.shard_segments("JD", shard))
+    assert {entry["file"] for entry in result["converted"]} == files
+    assert result["skipped"] == []
+    cv_entry = next(e for e in result["converted"] if e["file"].startswith("shard_cv_"))
+    assert cv_entry["pairs"] == 40 and cv_entry["max_score_delta"] <= compress_store.MAX_SCORE_DELTA
+    assert cv_entry["bytes_after"] < cv_entry["bytes_before"]
+
+    # same files, same vector ids: every metadata row still points at its own vector
+    rows = embeddings.get_metadata_store().rows("c1", "j1", "CV")
+    assert {storage_kind(faiss.read_index(f"{embeddings.INDICES_DIR}/{name}")) for name in {r["index_name"] for r in rows}} == {kind}
+    original = np.stack([
+        vectors[np.flatnonzero(labels == int(row["candidate_id"][len("cand"):]))[row["chunk_id"]]] for row in rows
+    ])
+    stored = compress_store._read_vectors(rows)
+    assert np.min(np.sum(original * stored, axis=1)) >= compress_store.MIN_COSINE
@@ -0,0 +1,116 @@
+import glob
+import json
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from score import compute_score, compute_scores_grouped, compute_scores_padded, group_slots, score_value
+
+STORE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vector_store")
+KS = [1, 3, 10, 50]
+
+
+def legacy_compute_score(jd_embedding, cv_vectors, k=10):
+    """The original per-vector loop, kept here as the reference."""
+    jd = jd_embedding / np.linalg.norm(jd_embedding)
+    sims = []
+    for cv in cv_vectors:
+        cv = cv / np.linalg.norm(cv)
+        sims.append(np.dot(jd, cv))
+    return legacy_score_of_sims(sims, k)
+
+
+def legacy_score_of_sims(sims, k=10):
+    """The original loop from the similarities on: sort, top-k mean, stretch and clamp, round."""
+    sims = list(sims)
+    sims.sort(reverse=True)
+    top = sims[:min(k, len(sims))]
+    stretched = (np.mean(top) - 0.2) / 0.3
+    stretched = max(0, min(1, stretched))
+    return round(stretched * 100, 2)
+
+
+def _legacy_pairs():
+    """(name, JD vector, CV vectors, CV of every vector) of the per-job indices in vector_store/."""
+    pairs = []
+    for cv_path in sorted(glob.glob(os.path.join(STORE, "indices", "*_cv.index"))):
+        name = os.path.basename(cv_path)[:-len("_cv.index")]
+        jd_path = os.path.join(STORE, "indices", f"{name}_jd.index")
+        if not os.path.exists(jd_path):
+            continue
+        index = faiss.read_index(cv_path)
+        with open(os.path.join(STORE, "metadata", f"{name}_cv.json")) as f:
+            chunk_ids = np.array([meta["chunk_id"] for meta in json.load(f)])
+        # chunk ids restart at 0 for every CV stored in the file
+        pairs.append((name, faiss.read_index(jd_path).reconstruct(0), index.reconstruct_n(0, index.ntotal),
+                      np.cumsum(chunk_ids == 0) - 1))
+    return pairs
+
+
+def _candidates(seed, n_candidates=300, dim=384):
+    """Chunk vectors of candidates with 1-24 chunks each, some close to the JD's topic, and the JD."""
+    rng = np.random.default_rng(seed)
+    labels = np.repeat(np.arange(n_candidates), rng.integers(1, 25, n_candidates))
+    topic = rng.standard_normal(dim)
+    weight = rng.uniform(0, 1.5, n_candidates)[labels, None]
+    vectors = (weight * topic + rng.standard_normal((len(labels), dim))).astype(np.float32)
+    jd = (topic + 0.5 * rng.standard_normal(dim)).astype(np.float32)
+    return jd, vectors, labels
+
+
+def _all_paths(jd, vectors, labels, k):
+    n = int(labels.max()) + 1
+    single = np.array([compute_score(jd, vectors[labels == i], k=k) for i in range(n)])
+    grouped = compute_scores_grouped(jd, vectors, labels, n, k=k)
+
+    # as CandidatePool.rank feeds it: similarities of normalized vectors
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    padded = compute_scores_padded(unit @ (jd / np.linalg.norm(jd)), group_slots(labels, n), k=k)
+    return single, grouped, padded
+
+
+def test_the_stored_indices_are_there():
+    assert _legacy_pairs()
+
+
+@pytest.mark.parametrize("k", KS)
+def test_scores_match_the_original_loop_on_the_stored_indices(k):
+    for name, jd, vectors, labels in _legacy_pairs():
+        assert compute_score(jd, vectors, k=k) == legacy_compute_score(jd, vectors, k=k), name
+
+        legacy = [legacy_compute_score(jd, vectors[labels == i], k=k) for i in range(int(labels.max()) + 1)]
+        for path in _all_paths(jd, vectors, labels, k):
+            assert path.tolist() == legacy, name
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("k", KS)
+def test_scores_match_the_original_loop_on_synthetic_candidates(seed, k):
+    # the original arithmetic from the same float32 similarities: the
+    # matrix product and the per-vector np.dot may sum in another order
+    jd, vectors, labels = _candidates(seed)
+    n = int(labels.max()) + 1
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    sims = unit @ (jd / np.linalg.norm(jd))
+    legacy = np.array([legacy_score_of_sims(sims[labels == i], k=k) for i in range(n)], dtype=np.float32)
+
+    for path in _all_paths(jd, vectors, labels, k):
+        assert np.array_equal(path, legacy)
+    assert 0 < np.count_nonzero(legacy) < n  # the set spans the clipped and the scaled range
+
+
+def test_scores_are_returned_as_two_decimal_floats():
+    jd, vectors, labels = _candidates(0, n_candidates=20)
+    for score in compute_scores_grouped(jd, vectors, labels, 20):
+        value = score_value(score)
+        assert type(value) is float and value == round(float(score), 2) and len(repr(value).split(".")[1]) <= 2
+
+
+def test_groups_without_rows_get_nan():
+    jd, vectors, labels = _candidates(1, n_candidates=3)
+    grouped = compute_scores_grouped(jd, vectors, labels, 5)
+    padded = compute_scores_padded(vectors @ jd, group_slots(labels, 5))
+    assert np.isnan(grouped[3:]).all() and np.isnan(padded[3:]).all()
+    assert not np.isnan(grouped[:3]).any()
@@ -0,0 +1,41 @@
+import time
+
+import numpy as np
+
+from embeddings import embeddings, store_maintenance
+
+
+def _store(tmp_path, monkeypatch):
+    """One shard under tmp_path with a real and a placeholder company of 5 CV chunks each."""
+    monkeypatch.chdir(tmp_path)  # STORE_ROOT is relative to the working directory
+    monkeypatch.setattr(embeddings, "_metadata_store", None)
+    monkeypatch.setattr(embeddings, "STORAGE_KIND", "flat")
+    monkeypatch.setattr(embeddings, "SHARD_COUNT", 1)
+    monkeypatch.setattr(store_maintenance, "SHARD_COUNT", 1)
+    monkeypatch.setattr(store_maintenance, "ANN_AUTO", False)
+
+    rng = np.random.default_rng(0)
+    for company_id in ("c1", "temp-company-1"):
+        vectors = rng.standard_normal((5, 384)).astype(np.float32)
+        embeddings.store_embeddings(vectors, [
+            embeddings.make_metadata(company_id, "j1", "CV", "cv", chunk_id=i, candidate_id="cand")
+            for i in range(5)
+        ])
+
+
+def test_compact_leaves_shards_without_dead_vectors_alone(tmp_path, monkeypatch):
+    _store(tmp_path, monkeypatch)
+    segments = embeddings.shard_segments("CV", 0)
+
+    assert store_maintenance.compact(min_dead_ratio=0) == {"compacted": []}
+    assert embeddings.shard_segments("CV", 0) == segments
+
+
+def test_compact_rewrites_shards_with_dead_vectors(tmp_path, monkeypatch):
+    _store(tmp_path, monkeypatch)
+    embeddings.get_metadata_store().delete_companies("temp-company-", time.time() + 1)
+
+    result = store_maintenance.compact(min_dead_ratio=0.5)
+
+    assert result == {"compacted": [{"shard": "shard_cv_000", "live": 5, "dead": 5}]}
+    assert store_maintenance.compact(min_dead_ratio=0) == {"compacted": []}
@@ -0,0 +1,19 @@
+import multiprocessing
+
+from embeddings import embeddings, stress_store
+
+
+def test_parallel_ingest_loses_no_vectors(tmp_path, monkeypatch):
+    # STORE_ROOT is relative to the working directory; a small segment
+    # size makes the racing writers roll over to new segments
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("VECTOR_SEGMENT_MAX", "20")  # spawned workers read it on import
+    monkeypatch.setenv("VECTOR_ANN_AUTO", "0")
+    monkeypatch.setattr(embeddings, "SEGMENT_MAX_VECTORS", 20)
+    monkeypatch.setattr(embeddings, "_metadata_store", None)
+
+    result = stress_store.run(processes=2, threads=3, cvs=8, mp_context=multiprocessing.get_context("spawn"))
+
+    assert result["problems"] == []
+    assert result["writers"] == 6 and result["cvs"] == 48
+    assert result["segments"] > 1
@@ -1,9 +1,11 @@
 import requests
-from pdfminer.high_level import extract_text
-import re
 from groq import Groq
 import json
 
+from .extraction_cache import ExtractionCache
+from .pdf_pages import extract_pdf_stats
+from .rule_extractor import MIN_CONFIDENCE as RULES_MIN_CONFIDENCE, extract_rules
+
 
 client = Groq(api_key="")
 
@@ -11,7 +13,11 @@ client = Groq(api_key="")
 # ---------------------------------------------------
 # DOWNLOAD CV PDF FROM CLOUDINARY LINK
 # ---------------------------------------------------
-def download_cv_pdf(url, filename="cv.pdf"):
+def download_cv_pdf(url, filename=None):
+    """
+    PDF bytes behind url, ready for extract_pdf. Only written to disk
+    when a filename is given (then the filename is returned).
+    """
     print("Downloading CV PDF...")
 
     r = requests.get(url, timeout=20)
@@ -21,6 +27,9 @@ def download_cv_pdf(url, filename="cv.pdf"):
     if not r.content.startswith(b"%PDF"):
         raise ValueError("Provided link does NOT point to a valid PDF")
 
+    if filename is None:
+        return r.content
+
     with open(filename, "wb") as f:
         f.write(r.content)
 
@@ -34,20 +43,23 @@ def download_cv_pdf(url, filename="cv.pdf"):
 # ---------------------------------------------------
 # EXTRACT RAW TEXT FROM PDF
 # ---------------------------------------------------
-def extract_pdf(path):
-    text = extract_text(path)
-    text = text.replace("\r", "\n")
-    text = re.sub(r"\n+", "\n", text)
-    return text.strip()
+def extract_pdf(source, executor=None):
+    """
+    Raw CV text, extracted page by page (see pdf_pages.iter_pdf_text).
+    source is a file path or the PDF bytes.
+    Pass a process pool as executor to run the work there; long PDFs
+    are then split across its workers.
+    """
+    return extract_pdf_stats(source, executor=executor)["text"]
 
 
 
 # ---------------------------------------------------
 # STEP 2: AI Structured JSON Extraction
 # ---------------------------------------------------
-def extract_and_clean(cv_text):
+EXTRACTION_MODEL = "openai/gpt-oss-20b"
 
-    prompt = f"""
+EXTRACTION_PROMPT = """
 You are an AI system that extracts resume data.
 
 Return output ONLY in this JSON format:
@@ -114,31 +126,76 @@ RAW RESUME TEXT:
 {cv_text}
 """
 
+
+def extract_and_clean(cv_text):
+
+    prompt = EXTRACTION_PROMPT.format(cv_text=cv_text)
+
     response = client.chat.completions.create(
-        model="openai/gpt-oss-20b",
+        model=EXTRACTION_MODEL,
         messages=[{"role": "user", "content": prompt}],
         temperature=0
     )
 
     return response.choices[0].message.content.strip()
 
+
 # ---------------------------------------------------
-# WRAPPER FUNCTION (USED BY ML PIPELINE)
+# CACHED STRUCTURING (same PDF text -> no LLM call,
+# confident rule-based extraction -> no LLM call)
 # ---------------------------------------------------
+_cache = None
 
-def extract_and_clean_from_file(file_path: str) -> dict:
+
+def get_extraction_cache() -> ExtractionCache:
+    global _cache
+    if _cache is None:
+        _cache = ExtractionCache()
+    return _cache
+
+
+def structure_cv_text(cv_text: str) -> dict:
     """
-    Extract CV text from local file and structure it.
-    Cloudinary is ONLY for storage, not extraction.
+    Structured CV JSON for extracted PDF text.
+    Served from the extraction cache when this exact text was already
+    structured with the current prompt and model; otherwise from the
+    rule-based extractor when it is confident (CV_RULES_MIN_CONFIDENCE)
+    and found the work history. The LLM is the fallback.
     """
-    cv_text = extract_pdf(file_path)
+    cache = get_extraction_cache()
+    key = cache.make_key(cv_text, EXTRACTION_PROMPT, EXTRACTION_MODEL)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    rules = extract_rules(cv_text)
+    if rules.usable(RULES_MIN_CONFIDENCE):
+        return rules.data
+
     result = extract_and_clean(cv_text)
 
     try:
-        return json.loads(result)
+        data = json.loads(result)
     except json.JSONDecodeError:
         raise RuntimeError("Failed to parse CV JSON from LLM")
 
+    cache.put(key, data)
+    return data
+
+
+# ---------------------------------------------------
+# WRAPPER FUNCTION (USED BY ML PIPELINE)
+# ---------------------------------------------------
+
+def extract_and_clean_from_file(file_path: str) -> dict:
+    """
+    Extract CV text from local file and structure it.
+    Cloudinary is ONLY for storage, not extraction.
+    """
+    cv_text = extract_pdf(file_path)
+    return structure_cv_text(cv_text)
+
 
 # ---------------------------------------------------
 # MAIN
@@ -149,8 +206,8 @@ def extract_and_clean_from_file(file_path: str) -> dict:
     cloudinary_cv_url = "PASTE_MANIKANTA_CLOUDINARY_PDF_LINK_HERE"
 
     try:
-        pdf_path = download_cv_pdf(cloudinary_cv_url)
-        cv_text = extract_pdf(pdf_path)
+        pdf_bytes = download_cv_pdf(cloudinary_cv_url)
+        cv_text = extract_pdf(pdf_bytes)
         output_json = extract_and_clean(cv_text)
         print(output_json)
 
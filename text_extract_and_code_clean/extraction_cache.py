@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+CACHE_PATH = os.getenv(
+    "CV_EXTRACTION_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "extractions.db"),
+)
+MAX_ENTRIES = int(os.getenv("CV_EXTRACTION_CACHE_MAX_ENTRIES", "20000"))
+MAX_BYTES = int(os.getenv("CV_EXTRACTION_CACHE_MAX_MB", "200")) * 1024 * 1024
+MAX_AGE_S = int(os.getenv("CV_EXTRACTION_CACHE_MAX_AGE_DAYS", "30")) * 24 * 3600
+
+
+# ---------------------------------------------------
+# PERSISTENT RESULT CACHE FOR LLM CV EXTRACTION
+# ---------------------------------------------------
+class ExtractionCache:
+    """
+    SQLite cache of structured CV JSON, keyed by
+    sha256(model + prompt template + extracted PDF text).
+
+    Entries older than max_age_s are dropped; beyond max_entries or
+    max_bytes the least recently used entries go first.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES,
+                 max_bytes: int = MAX_BYTES, max_age_s: int = MAX_AGE_S):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS extractions (
+                       key TEXT PRIMARY KEY,
+                       result TEXT NOT NULL,
+                       size INTEGER NOT NULL,
+                       created_at REAL NOT NULL,
+                       last_used REAL NOT NULL
+                   )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_extractions_last_used ON extractions(last_used)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(cv_text: str, prompt_template: str, model: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, prompt_template, cv_text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str):
+        """Cached structured JSON for key, or None on a miss / expired entry."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result, created_at FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.max_age_s:
+                conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, result: dict) -> None:
+        payload = json.dumps(result)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, result, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now: float) -> None:
+        conn.execute("DELETE FROM extractions WHERE created_at < ?", (now - self.max_age_s,))
+
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        # Walk from least recently used until both limits hold again
+        drop = []
+        for key, size in conn.execute("SELECT key, size FROM extractions ORDER BY last_used"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            drop.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM extractions WHERE key = ?", drop)
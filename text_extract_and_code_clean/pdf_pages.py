@@ -0,0 +1,198 @@
+import os
+import re
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+from typing import Iterator, List, NamedTuple, Optional, Union
+
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+# ---------------------------------------------------
+# LIMITS (per CV)
+# ---------------------------------------------------
+MAX_PAGES = int(os.getenv("CV_PDF_MAX_PAGES", "20"))
+MAX_BYTES = int(os.getenv("CV_PDF_MAX_MB", "10")) * 1024 * 1024
+# a page that takes longer is skipped (hard limit inside pool workers)
+PAGE_TIMEOUT_S = float(os.getenv("CV_PDF_PAGE_TIMEOUT_S", "10"))
+# documents with at least this many pages are split across the pool
+PARALLEL_MIN_PAGES = int(os.getenv("CV_PDF_PARALLEL_MIN_PAGES", "6"))
+PAGES_PER_TASK = int(os.getenv("CV_PDF_PAGES_PER_TASK", "3"))
+
+_NEWLINES = re.compile(r"[\r\n]+")
+
+# a PDF is read from a file path or straight from memory
+PDFSource = Union[str, bytes, bytearray, memoryview]
+
+
+class PageText(NamedTuple):
+    number: int            # 0-based page number
+    text: str              # raw pdfminer text, "" when the page failed
+    seconds: float         # time spent on the page
+    error: Optional[str]   # "timeout" / exception message, None when fine
+
+
+class PageTimeout(Exception):
+    pass
+
+
+@contextmanager
+def _time_limit(seconds: float):
+    """
+    Raise PageTimeout after seconds. Only possible in a process's main
+    thread (pool workers); elsewhere the page just runs to completion
+    and its time is still reported.
+    """
+    if (
+        not seconds
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def _raise(signum, frame):
+        raise PageTimeout()
+
+    previous = signal.signal(signal.SIGALRM, _raise)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def clean_page_text(text: str) -> str:
+    """
+    One regex pass: \\r -> \\n and newline runs collapsed. Pages end in a
+    form feed, so cleaning page by page equals cleaning the joined text.
+    """
+    return _NEWLINES.sub("\n", text)
+
+
+def open_pdf(source: PDFSource):
+    """Binary file object over a path or in-memory PDF bytes (no copy for bytes)."""
+    if isinstance(source, str):
+        return open(source, "rb")
+    return BytesIO(source)
+
+
+def source_size(source: PDFSource) -> int:
+    return os.path.getsize(source) if isinstance(source, str) else len(source)
+
+
+def source_label(source: PDFSource) -> str:
+    return os.path.basename(source) if isinstance(source, str) else "in-memory PDF"
+
+
+def count_pages(source: PDFSource) -> int:
+    """Page count from the page tree (no layout analysis)."""
+    with open_pdf(source) as fp:
+        return sum(1 for _ in PDFPage.get_pages(fp))
+
+
+def iter_pages(source: PDFSource, page_numbers=None, max_pages: int = MAX_PAGES,
+               page_timeout: float = PAGE_TIMEOUT_S) -> Iterator[PageText]:
+    """
+    Yield the text of a PDF one page at a time (the same text pdfminer's
+    extract_text produces for that page), at most max_pages pages.
+    A page that raises or exceeds page_timeout yields an empty text with
+    its error instead of failing the whole document.
+    """
+    wanted = None if page_numbers is None else set(page_numbers)
+    rsrcmgr = PDFResourceManager(caching=True)
+    laparams = LAParams()
+    yielded = 0
+
+    with open_pdf(source) as fp:
+        for number, page in enumerate(PDFPage.get_pages(fp, caching=True)):
+            if wanted is not None and number not in wanted:
+                continue
+            if yielded >= max_pages:
+                return
+
+            start = time.perf_counter()
+            output = StringIO()
+            device = TextConverter(rsrcmgr, output, laparams=laparams)
+            error = None
+            try:
+                with _time_limit(page_timeout):
+                    PDFPageInterpreter(rsrcmgr, device).process_page(page)
+            except PageTimeout:
+                error = "timeout"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                device.close()
+
+            text = output.getvalue() if error is None else ""
+            yield PageText(number, text, time.perf_counter() - start, error)
+            yielded += 1
+
+
+def extract_page_range(source: PDFSource, page_numbers: List[int], page_timeout: float = PAGE_TIMEOUT_S) -> List[PageText]:
+    """Process-pool task: the pages in page_numbers, in order."""
+    return list(iter_pages(source, page_numbers, max_pages=len(page_numbers), page_timeout=page_timeout))
+
+
+def iter_pdf_text(source: PDFSource, executor=None, max_pages: int = MAX_PAGES, max_bytes: int = MAX_BYTES,
+                  page_timeout: float = PAGE_TIMEOUT_S) -> Iterator[PageText]:
+    """
+    Page-by-page extraction engine, pages yielded in order. source is a
+    file path or the PDF bytes.
+
+    - PDFs over max_bytes are rejected before parsing
+    - without an executor pages are extracted here, one at a time
+    - with a (process pool) executor the work runs in the pool: small
+      documents as one task, documents of PARALLEL_MIN_PAGES+ pages split
+      into PAGES_PER_TASK-page tasks that run side by side. In-memory
+      PDFs are pickled into every task, so large ones are best passed
+      as a path
+    """
+    size = source_size(source)
+    if size > max_bytes:
+        raise ValueError(f"CV PDF is {size} bytes, over the {max_bytes} byte limit")
+
+    if executor is None:
+        yield from iter_pages(source, max_pages=max_pages, page_timeout=page_timeout)
+        return
+
+    if isinstance(source, memoryview):
+        source = source.tobytes()  # memoryviews cannot be pickled
+    numbers = list(range(min(count_pages(source), max_pages)))
+    step = PAGES_PER_TASK if len(numbers) >= PARALLEL_MIN_PAGES else max(len(numbers), 1)
+    tasks = [
+        executor.submit(extract_page_range, source, numbers[i:i + step], page_timeout)
+        for i in range(0, len(numbers), step)
+    ]
+    try:
+        for task in tasks:
+            yield from task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def extract_pdf_stats(source: PDFSource, executor=None, **limits) -> dict:
+    """
+    Cleaned text of a PDF plus per-page timing:
+    {"text", "pages": [{"number", "seconds", "error"}], "seconds"}.
+    """
+    start = time.perf_counter()
+    parts, pages = [], []
+    for page in iter_pdf_text(source, executor=executor, **limits):
+        parts.append(clean_page_text(page.text))
+        pages.append({"number": page.number, "seconds": round(page.seconds, 4), "error": page.error})
+        if page.error is not None:
+            print(f"⚠️ Skipped page {page.number + 1} of {source_label(source)}: {page.error}")
+
+    return {
+        "text": "".join(parts).strip(),
+        "pages": pages,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
@@ -0,0 +1,550 @@
+import os
+import re
+import time
+import argparse
+from collections import deque
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+# rule results at or above this confidence skip the LLM (set > 1 to disable)
+MIN_CONFIDENCE = float(os.getenv("CV_RULES_MIN_CONFIDENCE", "0.8"))
+MIN_SKILLS = int(os.getenv("CV_RULES_MIN_SKILLS", "3"))
+
+# fields the LLM has to fill when the rules miss them, whatever the confidence
+REQUIRED = ("experience",)
+# field weights of the confidence score (sum to 1)
+WEIGHTS = {
+    "name": 0.2,
+    "email": 0.2,
+    "phone": 0.1,
+    "skills": 0.2,
+    "education": 0.15,
+    "experience": 0.15,
+}
+
+
+# ---------------------------------------------------
+# SECTION HEADINGS
+# ---------------------------------------------------
+HEADINGS = {
+    "skills": (
+        "skills", "technical skills", "key skills", "core skills", "skill set", "skillset",
+        "core competencies", "technologies", "tech stack", "tools", "tools and technologies",
+        "skills and tools", "technical proficiency", "programming languages",
+    ),
+    "experience": (
+        "experience", "work experience", "professional experience", "employment",
+        "employment history", "work history", "internship", "internships",
+        "internship experience", "industrial experience",
+    ),
+    "education": (
+        "education", "academic background", "academics", "educational qualifications",
+        "educational qualification", "academic qualifications", "qualifications",
+        "education and training",
+    ),
+    "projects": ("projects", "academic projects", "personal projects", "key projects"),
+    "achievements": (
+        "achievements", "awards", "honors", "honours", "accomplishments", "certifications",
+        "certificates", "awards and achievements", "achievements and awards",
+        "extracurricular activities", "positions of responsibility",
+    ),
+    "summary": (
+        "summary", "profile", "objective", "career objective", "professional summary",
+        "about me", "profile summary",
+    ),
+    "other": (
+        "languages", "hobbies", "interests", "declaration", "references",
+        "personal details", "personal information", "contact", "contact details",
+    ),
+}
+_HEADING_OF = {heading: section for section, names in HEADINGS.items() for heading in names}
+
+
+# ---------------------------------------------------
+# CONTACT / DATE PATTERNS (same rules as the LLM prompt)
+# ---------------------------------------------------
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# +91 numbers or plain 10-digit numbers, optional spaces / dashes
+PHONE_RE = re.compile(r"(?<![\d+])(?:\+91[\s-]?|0)?[6-9]\d{4}[\s-]?\d{5}(?!\d)|(?<![\d+])\+\d{1,3}[\s-]?\d{3,4}[\s-]?\d{3,4}[\s-]?\d{3,4}(?!\d)")
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DATE = rf"(?:{_MONTH}\s*'?\d{{2,4}}|\d{{1,2}}/\d{{4}}|(?:19|20)\d{{2}})"
+DATE_RANGE_RE = re.compile(
+    rf"{_DATE}\s*(?:-|–|—|to|till)\s*(?:{_DATE}|present|current|now|ongoing|date)",
+    re.IGNORECASE,
+)
+YEAR_RE = re.compile(r"(?<!\d)(?:19|20)\d{2}(?:\s*(?:-|–|—|to)\s*(?:(?:19|20)\d{2}|present|current))?(?!\d)", re.IGNORECASE)
+
+DEGREE_RE = re.compile(
+    r"\b(?:b\.?\s?tech|m\.?\s?tech|b\.?e\b|m\.?e\b|b\.?sc|m\.?sc|b\.?com|m\.?com|b\.?a\b|m\.?a\b|bca|mca|bba|mba|"
+    r"ph\.?d|bachelor(?:'s)?(?: of [a-z ]+)?|master(?:'s)?(?: of [a-z ]+)?|diploma|"
+    r"intermediate|higher secondary|senior secondary|secondary|ssc|hsc|cbse|icse|class (?:x|xii|10|12)(?:th)?|"
+    r"(?:10|12)th)\b",
+    re.IGNORECASE,
+)
+INSTITUTE_RE = re.compile(
+    r"\b(?:university|institute|college|school|academy|vidyalaya|iit|nit|iiit|bits)\b", re.IGNORECASE
+)
+ROLE_RE = re.compile(
+    r"\b(?:engineer|developer|intern|analyst|manager|lead|scientist|consultant|designer|architect|"
+    r"associate|specialist|administrator|officer|trainee|programmer|researcher|head|director|sde)\b",
+    re.IGNORECASE,
+)
+_NAME_WORD = re.compile(r"^[A-Za-z][A-Za-z.'-]*$")
+_NOT_NAMES = {"curriculum vitae", "resume", "cv", "biodata", "bio data"}
+_PARTS_RE = re.compile(r"\s*(?:\||,\s|\s-\s|–|—)\s*")
+
+
+# ---------------------------------------------------
+# SKILLS DICTIONARY + AHO-CORASICK MATCHER
+# ---------------------------------------------------
+SKILLS = (
+    "Python", "Java", "JavaScript", "TypeScript", "C", "C++", "C#", "Go", "Rust", "Kotlin", "Swift",
+    "Scala", "R", "PHP", "Ruby", "Perl", "MATLAB", "Dart", "Bash", "Shell Scripting", "PowerShell",
+    "SQL", "MySQL", "PostgreSQL", "SQLite", "MongoDB", "Redis", "Cassandra", "Elasticsearch",
+    "Oracle", "DynamoDB", "Firebase", "Neo4j", "HTML", "CSS", "Sass", "Tailwind CSS", "Bootstrap",
+    "React", "React Native", "Angular", "Vue.js", "Next.js", "Node.js", "Express.js", "jQuery",
+    "Redux", "GraphQL", "REST APIs", "Django", "Flask", "FastAPI", "Spring", "Spring Boot",
+    "Hibernate", ".NET", "ASP.NET", "Laravel", "Ruby on Rails", "Flutter", "Android", "iOS",
+    "Git", "GitHub", "GitLab", "Bitbucket", "Docker", "Kubernetes", "Jenkins", "GitHub Actions",
+    "CI/CD", "Terraform", "Ansible", "AWS", "Azure", "GCP", "Google Cloud", "Heroku", "Linux",
+    "Nginx", "Kafka", "RabbitMQ", "Spark", "Hadoop", "Airflow", "Snowflake", "Databricks",
+    "Tableau", "Power BI", "Excel", "Pandas", "NumPy", "SciPy", "Matplotlib", "Seaborn",
+    "scikit-learn", "TensorFlow", "Keras", "PyTorch", "OpenCV", "NLTK", "spaCy", "Hugging Face",
+    "Transformers", "LangChain", "FAISS", "Machine Learning", "Deep Learning", "NLP",
+    "Computer Vision", "Data Analysis", "Data Science", "Data Structures", "Algorithms",
+    "Microservices", "OOP", "Agile", "Scrum", "Jira", "Postman", "Selenium", "JUnit", "Pytest",
+    "Jest", "Figma", "Unity", "Blender", "Solidity", "Blockchain", "Embedded C", "Arduino",
+    "Raspberry Pi", "Verilog", "VHDL", "AutoCAD", "SolidWorks", "LabVIEW", "SAP", "Salesforce",
+)
+SKILL_ALIASES = {
+    "js": "JavaScript", "ts": "TypeScript", "golang": "Go", "cpp": "C++", "c/c++": "C++",
+    "reactjs": "React", "react.js": "React", "vue": "Vue.js", "vuejs": "Vue.js", "nextjs": "Next.js",
+    "nodejs": "Node.js", "node": "Node.js", "express": "Express.js", "expressjs": "Express.js",
+    "postgres": "PostgreSQL", "mongo": "MongoDB", "k8s": "Kubernetes", "sklearn": "scikit-learn",
+    "scikit learn": "scikit-learn", "tf": "TensorFlow", "amazon web services": "AWS",
+    "google cloud platform": "GCP", "rest api": "REST APIs", "restful apis": "REST APIs",
+    "restful api": "REST APIs", "ml": "Machine Learning", "dl": "Deep Learning",
+    "natural language processing": "NLP", "ms excel": "Excel", "dsa": "Data Structures",
+    "object oriented programming": "OOP", "huggingface": "Hugging Face", "tailwind": "Tailwind CSS",
+}
+# one-letter / common-word skills only count inside a skills section
+AMBIGUOUS_SKILLS = {"c", "r", "go", "node", "express", "spring", "excel", "android", "ios", "unity",
+                    "oracle", "ts", "tf", "ml", "dl", "js", "vue"}
+_WORD_CHARS = set("abcdefghijklmnopqrstuvwxyz0123456789+#")
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over lowercase keywords: one pass over the
+    text finds every occurrence of every keyword, however many there are.
+    """
+
+    def __init__(self, keywords: Dict[str, str]):
+        # keywords: lowercase pattern -> value reported for a match
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+
+        for pattern, value in keywords.items():
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(pattern), value))
+
+        # breadth-first failure links; outputs inherit their fallback's
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """(start, end, value) of every keyword occurrence in lowercase text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                yield i + 1 - length, i + 1, value
+
+
+def _skill_keywords() -> Dict[str, str]:
+    keywords = {skill.lower(): skill for skill in SKILLS}
+    keywords.update(SKILL_ALIASES)
+    return keywords
+
+
+SKILL_MATCHER = KeywordAutomaton(_skill_keywords())
+
+
+def match_skills(text: str, allow_ambiguous: bool = True) -> List[str]:
+    """
+    Dictionary skills mentioned in text, in order of first mention.
+    Matches must sit on word boundaries; overlapping matches resolve to
+    the leftmost-longest ("C++" rather than "C", "React Native" rather
+    than "React").
+    """
+    lower = text.lower()
+    found = []
+    for start, end, value in SKILL_MATCHER.finditer(lower):
+        if start > 0 and lower[start - 1] in _WORD_CHARS:
+            continue
+        if end < len(lower) and lower[end] in _WORD_CHARS:
+            continue
+        if not allow_ambiguous and lower[start:end] in AMBIGUOUS_SKILLS:
+            continue
+        found.append((start, -(end - start), value))
+
+    skills, seen, covered_to = [], set(), -1
+    for start, neg_len, value in sorted(found):
+        if start < covered_to:
+            continue
+        covered_to = start - neg_len
+        if value not in seen:
+            seen.add(value)
+            skills.append(value)
+    return skills
+
+
+# ---------------------------------------------------
+# SECTIONS
+# ---------------------------------------------------
+def heading_of(line: str) -> Optional[str]:
+    """Section a line opens, if it is a heading ("TECHNICAL SKILLS:", "Education")."""
+    text = re.sub(r"[^a-z& ]+", " ", line.lower()).replace("&", " and ")
+    text = " ".join(text.split())
+    if not text or len(text.split()) > 5:
+        return None
+    return _HEADING_OF.get(text)
+
+
+def split_sections(lines: List[str]) -> Dict[str, List[str]]:
+    """
+    Lines grouped under the heading above them; "header" holds the lines
+    before the first heading. Inline headings ("Skills: Python, SQL") open
+    their section too, except "other" ones, which are mostly sub-labels
+    ("Languages: Python, Java" under technical skills).
+    """
+    sections = {"header": []}
+    current = "header"
+    for line in lines:
+        section = heading_of(line)
+        if section is not None:
+            current = section
+            sections.setdefault(current, [])
+            continue
+        label, colon, rest = line.partition(":")
+        if colon and rest.strip():
+            section = heading_of(label)
+            if section is not None and section != "other":
+                current = section
+                line = rest.strip()
+        sections.setdefault(current, []).append(line)
+    return sections
+
+
+# ---------------------------------------------------
+# FIELDS
+# ---------------------------------------------------
+def find_name(header: List[str]) -> str:
+    """First header line that looks like a person's name (2-4 capitalized words)."""
+    for line in header[:8]:
+        line = EMAIL_RE.sub("", PHONE_RE.sub("", line)).strip(" |,-•\t")
+        words = line.split()
+        if not 2 <= len(words) <= 4 or not all(_NAME_WORD.match(w) for w in words):
+            continue
+        if line.lower() in _NOT_NAMES or ROLE_RE.search(line) or heading_of(line):
+            continue
+        if match_skills(line, allow_ambiguous=False):
+            continue
+        return " ".join(w if not w.isupper() or len(w) <= 2 else w.capitalize() for w in words)
+    return ""
+
+
+def find_phone(text: str) -> str:
+    match = PHONE_RE.search(text)
+    return match.group(0).strip() if match else ""
+
+
+def parse_experience(lines: List[str]) -> List[dict]:
+    """
+    One entry per date range; role and company come from the rest of the
+    date line or, when it holds only the dates, from the (non-bullet)
+    lines just above it.
+    """
+    entries = []
+    for i, line in enumerate(lines):
+        match = DATE_RANGE_RE.search(line)
+        if not match:
+            continue
+        header = (line[:match.start()] + " " + line[match.end():]).strip(" |,-–—()\t")
+        context = [header] if header else []
+        for prev in reversed(lines[max(0, i - 2):i]):
+            if context and ROLE_RE.search(" ".join(context)):
+                break
+            if DATE_RANGE_RE.search(prev) or prev[:1] in "-•*▪●":
+                break
+            context.insert(0, prev)
+        role, company = _role_and_company(" | ".join(context))
+        if role or company:
+            entries.append({"company": company, "role": role, "duration": match.group(0)})
+    return entries
+
+
+def _role_and_company(text: str) -> Tuple[str, str]:
+    at = re.split(r"\s+at\s+|\s+@\s+", text, maxsplit=1, flags=re.IGNORECASE)
+    if len(at) == 2:
+        return at[0].strip(" |,-–—"), at[1].strip(" |,-–—")
+    parts = [p.strip() for p in _PARTS_RE.split(text) if p.strip()]
+    if not parts:
+        return "", ""
+    role = next((p for p in parts if ROLE_RE.search(p)), "")
+    company = next((p for p in parts if p != role), "")
+    return role, company
+
+
+def parse_education(lines: List[str]) -> List[dict]:
+    """Entries opened by a degree line; institute and year lines attach to the open entry."""
+    entries = []
+    current = None
+    for line in lines:
+        degree = DEGREE_RE.search(line)
+        institute = INSTITUTE_RE.search(line)
+        year = YEAR_RE.search(line)
+        if degree and (current is None or current["degree"]):
+            current = {"degree": "", "college": "", "year": ""}
+            entries.append(current)
+        elif current is None and institute:
+            current = {"degree": "", "college": "", "year": ""}
+            entries.append(current)
+        if current is None:
+            continue
+
+        # "B.Tech in CS, NIT Trichy, 2021": degree and institute are separate parts
+        parts = [p.strip(" ()\t•") for p in _PARTS_RE.split(YEAR_RE.sub("", line)) if p.strip(" ()\t•")]
+        if degree and not current["degree"]:
+            current["degree"] = next((p for p in parts if DEGREE_RE.search(p)), degree.group(0))
+        if institute and not current["college"]:
+            current["college"] = next((p for p in parts if INSTITUTE_RE.search(p) and p != current["degree"]), "")
+        if year and not current["year"]:
+            current["year"] = year.group(0)
+    return [e for e in entries if e["degree"] or e["college"]]
+
+
+def _one_line(lines: List[str]) -> str:
+    return " ".join(" ".join(lines).split())
+
+
+# ---------------------------------------------------
+# EXTRACTION
+# ---------------------------------------------------
+class RuleResult(NamedTuple):
+    data: dict          # same schema as the LLM extraction
+    confidence: float   # 0..1, weighted share of fields found
+    missing: List[str]  # fields that were not found
+
+    def usable(self, min_confidence: float = MIN_CONFIDENCE) -> bool:
+        """Good enough to skip the LLM: confident, and no REQUIRED field missed."""
+        return self.confidence >= min_confidence and not any(field in self.missing for field in REQUIRED)
+
+
+# raw_text labels per section; header / other text goes in unlabeled
+_LABELS = {
+    "summary": "Summary", "education": "Education", "skills": "Skills",
+    "experience": "Experience", "projects": "Projects", "achievements": "Achievements",
+}
+
+
+def _has_work_history(sections: Dict[str, List[str]]) -> bool:
+    """
+    Date ranges outside education and projects, or job titles outside
+    those and the header / summary (headlines, objectives): work history
+    under a heading we do not know ("Professional Background").
+    """
+    for section, lines in sections.items():
+        if section in ("education", "projects"):
+            continue
+        titles = section not in ("header", "summary")
+        if any(DATE_RANGE_RE.search(line) or (titles and ROLE_RE.search(line)) for line in lines):
+            return True
+    return False
+
+
+_CONTACT_LABELS = {"email", "e-mail", "mail", "phone", "mobile", "mob", "tel", "contact"}
+
+
+def _strip_contact(lines: List[str], name: str) -> List[str]:
+    """lines without email addresses, phone numbers, their labels and the name line."""
+    kept = []
+    for line in lines:
+        stripped = EMAIL_RE.sub("", PHONE_RE.sub("", line))
+        if stripped != line:
+            stripped = " | ".join(
+                part for part in _PARTS_RE.split(stripped)
+                if part.strip(" :.\t").lower() not in _CONTACT_LABELS
+            )
+        stripped = stripped.strip(" |,-•\t")
+        if stripped and stripped.lower() != name.lower():
+            kept.append(stripped)
+    return kept
+
+
+def extract_rules(cv_text: str) -> RuleResult:
+    """
+    Structured CV JSON from the PDF text with headings, regexes and the
+    skills dictionary (no LLM). raw_text is the name followed by all
+    non-contact text, section by section, so text under headings the
+    rules do not know is still embedded and scored.
+    """
+    lines = [line.strip() for line in cv_text.splitlines() if line.strip()]
+    sections = split_sections(lines)
+
+    name = find_name(sections["header"] or lines)
+    email_match = EMAIL_RE.search(cv_text)
+    email = email_match.group(0) if email_match else ""
+    phone = find_phone(cv_text)
+
+    skill_lines = sections.get("skills", [])
+    skills = match_skills(_one_line(skill_lines)) if skill_lines else []
+    for section in ("experience", "projects", "summary"):
+        for skill in match_skills(_one_line(sections.get(section, [])), allow_ambiguous=False):
+            if skill not in skills:
+                skills.append(skill)
+
+    experience = parse_experience(sections.get("experience", []))
+    education = parse_education(sections.get("education", []))
+
+    found = {
+        "name": bool(name),
+        "email": bool(email),
+        "phone": bool(phone),
+        "skills": len(skills) >= MIN_SKILLS,
+        "education": bool(education),
+        # freshers have no work history; that is not a miss, but dates or
+        # job titles we could not parse into entries are
+        "experience": bool(experience) or (
+            "experience" not in sections and not _has_work_history(sections)
+        ),
+    }
+    confidence = sum(WEIGHTS[field] for field, ok in found.items() if ok)
+
+    parts = [name]
+    for section, section_lines in sections.items():
+        text = _one_line(_strip_contact(section_lines, name))
+        if text:
+            parts.append(f"{_LABELS[section]}: {text}" if section in _LABELS else text)
+
+    data = {
+        "raw_text": ". ".join(p.rstrip(". ") for p in parts if p),
+        "name": name,
+        "email": email,
+        "phone": phone,
+        "skills": skills,
+        "experience": experience,
+        "education": education,
+    }
+    return RuleResult(data, round(confidence, 3), [field for field, ok in found.items() if not ok])
+
+
+# ---------------------------------------------------
+# BENCHMARK: python -m text_extract_and_code_clean.rule_extractor CORPUS_DIR
+# ---------------------------------------------------
+def _load_corpus(corpus_dir: str) -> List[Tuple[str, str]]:
+    from .pdf_pages import extract_pdf_stats
+
+    corpus = []
+    for name in sorted(os.listdir(corpus_dir)):
+        path = os.path.join(corpus_dir, name)
+        if name.lower().endswith(".pdf"):
+            corpus.append((name, extract_pdf_stats(path)["text"]))
+        elif name.lower().endswith(".txt"):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                corpus.append((name, f.read()))
+    return corpus
+
+
+def _cached_llm_result(cv_text: str):
+    """The LLM's structured JSON for this text, if the extraction cache has it."""
+    try:
+        from .code import EXTRACTION_MODEL, EXTRACTION_PROMPT, get_extraction_cache
+    except ImportError:
+        return None
+    cache = get_extraction_cache()
+    return cache.get(cache.make_key(cv_text, EXTRACTION_PROMPT, EXTRACTION_MODEL))
+
+
+def benchmark(corpus_dir: str, min_confidence: float = MIN_CONFIDENCE, repeat: int = 5) -> dict:
+    """
+    Run the rule extractor over every .pdf / .txt in corpus_dir and report
+    how many CVs would skip the LLM, rule latency, field fill rates and,
+    where the extraction cache holds the LLM answer for the same text,
+    agreement with it.
+    """
+    corpus = _load_corpus(corpus_dir)
+    if not corpus:
+        raise SystemExit(f"No .pdf or .txt files in {corpus_dir}")
+
+    latencies, avoided, fills, agree = [], 0, {}, {"compared": 0, "name": 0, "email": 0, "phone": 0, "skills_jaccard": 0.0}
+    for name, text in corpus:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = extract_rules(text)
+        latencies.append((time.perf_counter() - start) / repeat * 1000)
+        if result.usable(min_confidence):
+            avoided += 1
+        for field in WEIGHTS:
+            fills[field] = fills.get(field, 0) + (field not in result.missing)
+        print(f"{name}: confidence {result.confidence:.2f}, missing {result.missing or '-'}")
+
+        llm = _cached_llm_result(text)
+        if llm:
+            agree["compared"] += 1
+            for field in ("name", "email", "phone"):
+                agree[field] += str(llm.get(field, "")).strip().lower() == str(result.data[field]).strip().lower()
+            a = {s.lower() for s in llm.get("skills", [])}
+            b = {s.lower() for s in result.data["skills"]}
+            agree["skills_jaccard"] += len(a & b) / len(a | b) if a | b else 1.0
+
+    latencies.sort()
+    n = len(corpus)
+    report = {
+        "cvs": n,
+        "min_confidence": min_confidence,
+        "llm_avoided": avoided,
+        "llm_avoidance_rate": round(avoided / n, 3),
+        "latency_ms_mean": round(sum(latencies) / n, 3),
+        "latency_ms_p50": round(latencies[n // 2], 3),
+        "latency_ms_p95": round(latencies[min(n - 1, int(n * 0.95))], 3),
+        "fill_rate": {field: round(count / n, 3) for field, count in fills.items()},
+    }
+    if agree["compared"]:
+        compared = agree.pop("compared")
+        report["llm_agreement"] = {"compared": compared, **{k: round(v / compared, 3) for k, v in agree.items()}}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rule-based CV extraction benchmark")
+    parser.add_argument("corpus_dir", help="directory of CV .pdf / .txt files")
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per CV")
+    args = parser.parse_args()
+
+    for key, value in benchmark(args.corpus_dir, args.min_confidence, args.repeat).items():
+        print(f"{key}: {value}")